@@ -1,6 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.authentication import TokenAuthentication as BaseTokenAuth
+from rest_framework.authentication import get_authorization_header
 from rest_framework.authtoken.models import Token as Tkn
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+def get_auth_cache_timeout():
+    return getattr(settings, "AUTH_CACHE_TIMEOUT", 60)
+
+
+def token_cache_key(key):
+    # never put the raw token in the cache key
+    return "auth:token:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def jwt_user_cache_key(user_id):
+    return f"auth:jwt_user:{user_id}"
+
+
+def invalidate_user(user):
+    """Drop every cached auth entry that resolves to `user`."""
+    keys = [jwt_user_cache_key(user.pk)]
+    keys += [token_cache_key(key) for key in Tkn.objects.filter(user=user).values_list("key", flat=True)]
+    cache.delete_many(keys)
 
 
 class TokenAuthentication(BaseTokenAuth):
     keyword = "Bearer"
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            user, token = cached
+            # same check as the uncached path, the entry can outlive a deactivation
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed("User inactive or deleted.")
+            return cached
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token), get_auth_cache_timeout())
+        return user, token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        cache_key = jwt_user_cache_key(user_id)
+        user = cache.get(cache_key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(cache_key, user, get_auth_cache_timeout())
+        elif not user.is_active:
+            raise exceptions.AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class SchemeAuthentication:
+    """
+    Runs only the authenticator that can handle the request instead of
+    the whole chain:
+      no Authorization header -> session
+      Bearer <header.payload.signature> -> JWT
+      Bearer <token key> -> DRF token
+    """
+
+    def __init__(self):
+        self.session = SessionAuthentication()
+        self.jwt = CachedJWTAuthentication()
+        self.token = TokenAuthentication()
+
+    def get_authenticator(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth:
+            return self.session
+        if len(auth) == 2 and auth[1].count(b".") == 2:
+            return self.jwt
+        return self.token
+
+    def authenticate(self, request):
+        return self.get_authenticator(request).authenticate(request)
+
+    def authenticate_header(self, request):
+        return self.jwt.authenticate_header(request)
@@ -0,0 +1,68 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+LIST_CACHE_TIMEOUT = 60 * 5
+
+
+def new_generation():
+    # time based, so a version key lost to eviction never restarts at a
+    # number that cached pages were already built for
+    return time.time_ns() // 1000
+
+
+def user_version_key(user_id):
+    return f"products:user:{user_id}:version"
+
+
+def get_user_version(user_id):
+    key = user_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        generation = new_generation()
+        cache.add(key, generation, timeout=None)
+        version = cache.get(key, generation)
+    return version
+
+
+def bump_user_version(user_id):
+    """
+    O(1) invalidation: every cached page of this user embeds the old
+    version in its key, so they are simply never read again (and expire).
+    """
+    if user_id is None:
+        return
+    try:
+        cache.incr(user_version_key(user_id))
+    except ValueError:
+        # key missing (evicted / never read), start a new generation
+        cache.add(user_version_key(user_id), new_generation(), timeout=None)
+
+
+class UserCachedListMixin:
+    """
+    Caches the serialized list page per user, keyed by the user's
+    version counter (bumped by products.signals on save/delete).
+    Use together with UserQuerySetMixin.
+    """
+
+    list_cache_timeout = LIST_CACHE_TIMEOUT
+
+    def get_list_cache_key(self, request):
+        version = get_user_version(request.user.pk)
+        url = request.build_absolute_uri()
+        digest = hashlib.md5(url.encode("utf-8")).hexdigest()
+        return f"products:list:user:{request.user.pk}:v{version}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        key = self.get_list_cache_key(request)
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            cache.set(key, response.data, self.list_cache_timeout)
+            return response
+        return Response(data)
@@ -0,0 +1,262 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.db import connections
+
+# & scenario
+
+ID_RE = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(method, path):
+    # /products/12/?limit=5 -> "GET /products/{id}/"
+    path = ID_RE.sub("/{id}", path.split("?", 1)[0])
+    return f"{method} {path}"
+
+
+def load_scenario(path):
+    """
+    One request per line:
+    {"method": "GET", "path": "/products/", "body": {...}, "headers": {...}, "name": "..."}
+    Only `path` is required, `method` defaults to GET.
+    """
+    entries = []
+    for lineno, line in enumerate(Path(path).read_text().splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f"{path}:{lineno}: {exc}") from exc
+        if "path" not in entry:
+            raise ValueError(f"{path}:{lineno}: missing 'path'")
+        method = entry.get("method", "GET").upper()
+        entries.append(
+            {
+                "method": method,
+                "path": entry["path"],
+                "body": entry.get("body"),
+                "headers": entry.get("headers") or {},
+                "name": entry.get("name") or endpoint_name(method, entry["path"]),
+            }
+        )
+    return entries
+
+
+# & transports
+class InProcessTransport:
+    """
+    Django test client, one per worker thread. No sockets, so the numbers
+    are the cost of middleware + view + serializer + renderer.
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.local = threading.local()
+
+    def get_client(self):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            from rest_framework.test import APIClient
+
+            client = APIClient(raise_request_exception=False)
+            if self.user is not None:
+                client.force_authenticate(self.user)
+            self.local.client = client
+        return client
+
+    def send(self, entry, headers):
+        body = entry["body"]
+        data = json.dumps(body) if body is not None else None
+        response = self.get_client().generic(
+            entry["method"],
+            entry["path"],
+            data=data or "",
+            content_type="application/json",
+            headers=headers,
+        )
+        if response.streaming:
+            # the export view streams, consuming it is part of the cost
+            return response.status_code, sum(len(chunk) for chunk in response.streaming_content)
+        return response.status_code, len(response.content)
+
+    def close(self):
+        # every worker thread opened its own database connection
+        connections.close_all()
+
+
+class HTTPTransport:
+    """
+    Real requests against a running server (runserver, gunicorn, ...),
+    one keep-alive session per worker thread.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.local = threading.local()
+
+    def get_session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            import requests
+
+            session = self.local.session = requests.Session()
+        return session
+
+    def send(self, entry, headers):
+        response = self.get_session().request(
+            entry["method"],
+            self.base_url + entry["path"],
+            json=entry["body"],
+            headers=headers,
+        )
+        return response.status_code, len(response.content)
+
+    def close(self):
+        session = getattr(self.local, "session", None)
+        if session is not None:
+            session.close()
+
+
+# & running
+class LoadRun:
+    """
+    Replays the scenario `repeat` times with `concurrency` worker threads
+    pulling from one shared queue, and keeps (name, status, seconds) for
+    every request.
+    """
+
+    def __init__(self, entries, transport, concurrency=1, repeat=1, warmup=0, headers=None):
+        self.entries = entries
+        self.transport = transport
+        self.concurrency = max(concurrency, 1)
+        self.repeat = repeat
+        self.warmup = warmup
+        self.headers = headers or {}
+        self.samples = []
+        self.lock = threading.Lock()
+        self.wall_time = 0.0
+
+    def send(self, entry):
+        headers = {**self.headers, **entry["headers"]}
+        start = time.perf_counter()
+        try:
+            status, size = self.transport.send(entry, headers)
+        except Exception:
+            status, size = 0, 0
+        return status, size, time.perf_counter() - start
+
+    def worker(self, jobs):
+        try:
+            while True:
+                with self.lock:
+                    entry = next(jobs, None)
+                if entry is None:
+                    break
+                status, size, seconds = self.send(entry)
+                with self.lock:
+                    self.samples.append((entry["name"], status, seconds, size))
+        finally:
+            self.transport.close()
+
+    def run(self):
+        # warm up caches / connections / lazy imports, not recorded
+        for _ in range(self.warmup):
+            for entry in self.entries:
+                self.send(entry)
+        jobs = iter([entry for _ in range(self.repeat) for entry in self.entries])
+        threads = [
+            threading.Thread(target=self.worker, args=(jobs,)) for _ in range(self.concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.perf_counter() - start
+        return self.samples
+
+
+# & reporting
+def percentile(sorted_values, p):
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, wall_time):
+    """
+    {endpoint: {count, errors, p50, p95, p99, mean, rps, bytes}} with
+    latencies in ms, plus an "ALL" row. Errors are status >= 400 and
+    requests that raised (status 0).
+    """
+    grouped = defaultdict(list)
+    for name, status, seconds, size in samples:
+        grouped[name].append((status, seconds, size))
+        grouped["ALL"].append((status, seconds, size))
+    summary = {}
+    for name, rows in grouped.items():
+        latencies = sorted(seconds * 1000 for _, seconds, _ in rows)
+        summary[name] = {
+            "count": len(rows),
+            "errors": sum(1 for status, _, _ in rows if status == 0 or status >= 400),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": sum(latencies) / len(latencies),
+            "rps": len(rows) / wall_time if wall_time else 0.0,
+            "bytes": sum(size for _, _, size in rows) // len(rows),
+        }
+    return summary
+
+
+def format_summary(summary):
+    lines = [
+        f"{'endpoint':<40} {'count':>6} {'err':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}"
+    ]
+    for name in sorted(summary, key=lambda name: (name == "ALL", name)):
+        row = summary[name]
+        lines.append(
+            f"{name[:40]:<40} {row['count']:>6} {row['errors']:>5} {row['p50']:>8.2f} "
+            f"{row['p95']:>8.2f} {row['p99']:>8.2f} {row['rps']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(baseline, current):
+    """
+    Per endpoint relative change of the latency percentiles and
+    throughput, as {endpoint: {metric: (before, after, change %)}}.
+    Negative latency change / positive rps change is an improvement.
+    """
+    report = {}
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name], current[name]
+        report[name] = {
+            metric: (
+                before[metric],
+                after[metric],
+                (after[metric] - before[metric]) / before[metric] * 100 if before[metric] else 0.0,
+            )
+            for metric in ("p50", "p95", "p99", "rps")
+        }
+    return report
+
+
+def format_comparison(report):
+    lines = [f"{'endpoint':<40} {'p50':>18} {'p95':>18} {'p99':>18} {'req/s':>18}"]
+    for name in sorted(report, key=lambda name: (name == "ALL", name)):
+        cells = [
+            f"{before:>7.1f}>{after:<7.1f}{change:+4.0f}%"
+            for before, after, change in report[name].values()
+        ]
+        lines.append(f"{name[:40]:<40} " + " ".join(f"{cell:>18}" for cell in cells))
+    return "\n".join(lines)
@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from api.loadgen import (
+    HTTPTransport,
+    InProcessTransport,
+    LoadRun,
+    compare,
+    format_comparison,
+    format_summary,
+    load_scenario,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a JSONL file of requests (method, path, body, headers) in process "
+        "or against --base-url, and report latency percentiles and throughput per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", help="JSONL file, one request per line")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--repeat", type=int, default=10, help="passes over the scenario")
+        parser.add_argument("--warmup", type=int, default=1, help="unrecorded passes first")
+        parser.add_argument(
+            "--base-url", default=None, help="e.g. http://localhost:8000, default is in process"
+        )
+        parser.add_argument(
+            "--user", default=None, help="username to force-authenticate as (in process only)"
+        )
+        parser.add_argument(
+            "-H", "--header", action="append", default=[], help="'Name: value' added to every request"
+        )
+        parser.add_argument("--output", default=None, help="save the run summary as JSON")
+        parser.add_argument("--compare", default=None, help="summary JSON of an earlier run")
+
+    def get_transport(self, options):
+        if options["base_url"]:
+            return HTTPTransport(options["base_url"])
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user {options['user']!r}")
+        return InProcessTransport(user=user)
+
+    def handle(self, *args, **options):
+        try:
+            entries = load_scenario(options["scenario"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+        if not entries:
+            raise CommandError("The scenario is empty")
+        headers = {}
+        for header in options["header"]:
+            name, _, value = header.partition(":")
+            headers[name.strip()] = value.strip()
+
+        run = LoadRun(
+            entries,
+            self.get_transport(options),
+            concurrency=options["concurrency"],
+            repeat=options["repeat"],
+            warmup=options["warmup"],
+            headers=headers,
+        )
+        # the test client talks to "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            samples = run.run()
+        summary = summarize(samples, run.wall_time)
+        self.stdout.write(
+            f"{len(samples)} requests, concurrency {run.concurrency}, {run.wall_time:.2f}s"
+        )
+        self.stdout.write(format_summary(summary))
+
+        if options["output"]:
+            data = {
+                "scenario": options["scenario"],
+                "base_url": options["base_url"],
+                "concurrency": run.concurrency,
+                "repeat": run.repeat,
+                "wall_time": run.wall_time,
+                "endpoints": summary,
+            }
+            Path(options["output"]).write_text(json.dumps(data, indent=2))
+        if options["compare"]:
+            baseline = json.loads(Path(options["compare"]).read_text())
+            self.stdout.write(f"\ncompared with {options['compare']} (before>after change)")
+            self.stdout.write(format_comparison(compare(baseline["endpoints"], summary)))
@@ -1,5 +1,16 @@
-from rest_framework import permissions
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import permissions, status
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
 from .permission import *
+from .cache import UserCachedListMixin
+from .profiling import profile_section
 
 
 class StaffEditorPermissionMixin:
@@ -17,3 +28,123 @@ class UserQuerySetMixin:
         #     return qs
 
         return qs.filter(**lookup_data)
+
+
+class FastListMixin:
+    """
+    list() through `fast_list_serializer_class` (prepare(queryset) +
+    serialize(rows)) instead of serializer_class. Leave it None to keep
+    the regular DRF serializer.
+    """
+
+    fast_list_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.fast_list_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        fast = self.fast_list_serializer_class(context=self.get_serializer_context())
+        queryset = fast.prepare(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        with profile_section("serialize"):
+            data = fast.serialize(rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for list() and retrieve(), worked out from
+    max(updated_at) and count() of the rows behind the response, so an
+    unchanged resource is answered with 304 before anything is serialized.
+
+    Cursor pages are the exception: aggregating the whole queryset on
+    every page would bring back the COUNT that cursor pagination avoids,
+    so their ETag is a hash of the page that is returned.
+
+    The representation depends on who is asking (querysets scoped to the
+    user, per-user fields), so the ETag includes the user id and responses
+    carry Vary: Authorization, Cookie.
+    """
+
+    vary_headers = ("Authorization", "Cookie")
+
+    updated_field = "updated_at"
+    # when the detail representation embeds sibling rows (e.g. the owner's
+    # other products), the stats cover every row sharing this field's value
+    object_scope_field = None
+
+    def get_queryset_stats(self, queryset):
+        return queryset.aggregate(last_modified=Max(self.updated_field), count=Count("pk"))
+
+    def get_object_stats(self, instance):
+        scope = getattr(instance, self.object_scope_field) if self.object_scope_field else None
+        if scope is None:
+            return {"last_modified": getattr(instance, self.updated_field), "count": 1}
+        queryset = type(instance)._default_manager.filter(**{self.object_scope_field: scope})
+        return self.get_queryset_stats(queryset)
+
+    def get_etag(self, request, stats):
+        last_modified = stats["last_modified"]
+        stamp = last_modified.isoformat() if last_modified else ""
+        return self.make_etag(request, f"{stats['count']}:{stamp}")
+
+    def make_etag(self, request, validator):
+        user_id = getattr(request.user, "pk", None) or ""
+        raw = f"{validator}:{user_id}:{request.get_full_path()}"
+        return 'W/"%s"' % hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    def is_cursor_request(self, request):
+        paginator = self.paginator
+        if hasattr(paginator, "get_paginator"):  # OptInCursorPagination
+            paginator = paginator.get_paginator(request)
+        return isinstance(paginator, CursorPagination)
+
+    def not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return etag in tags or "*" in tags
+        if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        if if_modified_since is not None and last_modified is not None:
+            return int(last_modified.timestamp()) <= if_modified_since
+        return False
+
+    def conditional_response(self, request, stats, build_response):
+        etag = self.get_etag(request, stats)
+        last_modified = stats["last_modified"]
+        if self.not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build_response()
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, self.vary_headers)
+        return response
+
+    def cursor_list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        content = json.dumps(response.data, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = self.make_etag(request, hashlib.md5(content.encode("utf-8")).hexdigest())
+        if self.not_modified(request, etag, None):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        response["ETag"] = etag
+        patch_vary_headers(response, self.vary_headers)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if self.is_cursor_request(request):
+            return self.cursor_list(request, *args, **kwargs)
+        stats = self.get_queryset_stats(self.filter_queryset(self.get_queryset()))
+        return self.conditional_response(
+            request, stats, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        stats = self.get_object_stats(instance)
+        return self.conditional_response(
+            request, stats, lambda: Response(self.get_serializer(instance).data)
+        )
@@ -0,0 +1,120 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    LimitOffsetPagination,
+)
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination: WHERE id > <cursor> ORDER BY id LIMIT n.
+    No OFFSET and no COUNT(*), so every page costs the same.
+    """
+
+    ordering = "id"
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class ProductPriceCursorPagination(ProductCursorPagination):
+    """
+    Keyset on (price, id). DRF's CursorPagination positions on the first
+    ordering field only and skips ties with OFFSET, and most products
+    share the default price. Here the cursor carries both values of the
+    last row and the next page is
+    WHERE price > p OR (price = p AND id > i) ORDER BY price, id LIMIT n.
+    """
+
+    ordering = ("price", "id")
+
+    def _get_position_from_instance(self, instance, ordering):
+        # unique, so get_next_link / get_previous_link never add an offset
+        if isinstance(instance, dict):
+            return f"{instance['price']},{instance['id']}"
+        return f"{instance.price},{instance.id}"
+
+    def position_filter(self, position, reverse):
+        try:
+            price, pk = position.split(",")
+            price, pk = Decimal(price), int(pk)
+        except (ValueError, InvalidOperation):
+            raise NotFound(self.invalid_cursor_message)
+        op = "lt" if reverse else "gt"
+        return Q(**{f"price__{op}": price}) | Q(price=price, **{f"id__{op}": pk})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # CursorPagination.paginate_queryset with the composite filter;
+        # positions are unique so the cursor offset is always 0
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor is not None else None
+
+        if reverse:
+            queryset = queryset.order_by(*(f"-{field}" for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.position_filter(current_position, reverse))
+
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        has_following = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = current_position is not None, current_position
+            self.has_previous, self.previous_position = has_following, following_position
+        else:
+            self.has_next, self.next_position = has_following, following_position
+            self.has_previous, self.previous_position = current_position is not None, current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class OptInCursorPagination(BasePagination):
+    """
+    Limit/offset by default (same as REST_FRAMEWORK settings).
+    Clients opt in to cursor pagination with ?paginate=cursor,
+    and pick the (price, id) keyset with ?order=price.
+    The next/previous links keep both params.
+    """
+
+    cursor_query_param = "cursor"
+
+    def get_paginator(self, request):
+        params = request.query_params
+        if params.get("paginate") != "cursor" and self.cursor_query_param not in params:
+            return LimitOffsetPagination()
+        if params.get("order") == "price":
+            return ProductPriceCursorPagination()
+        return ProductCursorPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return LimitOffsetPagination().get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, "display_page_controls", False)
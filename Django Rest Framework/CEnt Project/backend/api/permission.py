@@ -1,11 +1,78 @@
+from collections import Counter
+
+from django.core.cache import cache
 from rest_framework import permissions
 
+from .cache import new_generation
+
+PERMISSION_CACHE_TIMEOUT = 60
+PERMISSION_VERSION_KEY = "auth:perms:version"
+
+# & instrumentation: request_hits / cache_hits / misses
+permission_cache_stats = Counter()
+
+
+def bump_permission_version():
+    """Called when groups / permissions / their assignments change."""
+    try:
+        cache.incr(PERMISSION_VERSION_KEY)
+    except ValueError:
+        # evicted: a fresh generation, never one a cached set was built under
+        cache.add(PERMISSION_VERSION_KEY, new_generation(), timeout=None)
+
+
+def get_permission_set(request):
+    """
+    The user's resolved "app_label.codename" permissions, memoised on the
+    request and cached across requests for PERMISSION_CACHE_TIMEOUT seconds.
+    """
+    cached = getattr(request, "_permission_set", None)
+    if cached is not None:
+        permission_cache_stats["request_hits"] += 1
+        return cached
+    user = request.user
+    version = cache.get_or_set(PERMISSION_VERSION_KEY, new_generation, timeout=None)
+    key = f"auth:perms:{user.pk}:v{version}"
+    perms = cache.get(key)
+    if perms is None:
+        permission_cache_stats["misses"] += 1
+        perms = frozenset(user.get_all_permissions())
+        cache.set(key, perms, PERMISSION_CACHE_TIMEOUT)
+    else:
+        permission_cache_stats["cache_hits"] += 1
+    request._permission_set = perms
+    return perms
+
+
+def user_has_perms(request, perms):
+    user = request.user
+    if not user.is_active:
+        return False
+    if user.is_superuser:
+        return True
+    return set(perms) <= get_permission_set(request)
+
+
+class CachedDjangoModelPermissions(permissions.DjangoModelPermissions):
+    """DjangoModelPermissions that reads the memoised permission set."""
+
+    def has_permission(self, request, view):
+        if not request.user or (
+            not request.user.is_authenticated and self.authenticated_users_only
+        ):
+            return False
+        if getattr(view, "_ignore_model_permissions", False):
+            return True
+        queryset = self._queryset(view)
+        perms = self.get_required_permissions(request.method, queryset.model)
+        return user_has_perms(request, perms)
+
 
-class IsStaffEditorPermission(permissions.DjangoModelPermissions):
+class IsStaffEditorPermission(CachedDjangoModelPermissions):
     def has_permission(self, request, view):
         usr = request.user
         if usr.is_staff:
             if request.method == "GET":
-                return usr.has_perm("products.view_product")
+                return user_has_perms(request, ["products.view_product"])
             return True
         return super().has_permission(request, view)
@@ -0,0 +1,183 @@
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+_current_profile = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """
+    What one request cost: number of SQL queries and the time spent in
+    the database, in serializers (`.data`) and in the renderer, in ms.
+    Lazy queries run while serializing (N+1) count in both db and serialize.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += (time.perf_counter() - start) * 1000
+
+    def server_timing(self):
+        return ", ".join(
+            [
+                f'db;dur={self.db:.2f};desc="{self.queries} queries"',
+                f"serialize;dur={self.serialize:.2f}",
+                f"render;dur={self.render:.2f}",
+                f"total;dur={self.total:.2f}",
+            ]
+        )
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+@contextmanager
+def profile_section(name):
+    """
+    Add the time spent in the block to the current request's profile
+    (`serialize` or `render`). A no-op outside a profiled request.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(profile, name, getattr(profile, name) + (time.perf_counter() - start) * 1000)
+
+
+# & aggregated, in memory, per process
+class ProfileStats:
+    fields = ("queries", "db", "serialize", "render", "total")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, key, profile):
+        with self.lock:
+            row = self.endpoints.get(key)
+            if row is None:
+                row = self.endpoints[key] = {"count": 0}
+                for field in self.fields:
+                    row[field] = row[f"max_{field}"] = 0
+            row["count"] += 1
+            for field in self.fields:
+                value = getattr(profile, field)
+                row[field] += value
+                row[f"max_{field}"] = max(row[f"max_{field}"], value)
+
+    def snapshot(self):
+        """
+        {endpoint: {count, avg_<field>, max_<field>}}, times in ms
+        """
+        with self.lock:
+            data = {}
+            for key, row in self.endpoints.items():
+                entry = {"count": row["count"]}
+                for field in self.fields:
+                    entry[f"avg_{field}"] = round(row[field] / row["count"], 2)
+                    entry[f"max_{field}"] = round(row[f"max_{field}"], 2)
+                data[key] = entry
+            return data
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+profile_stats = ProfileStats()
+
+
+def endpoint_key(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        # one row for every 404, not one per path a client made up
+        return f"{request.method} <unresolved>"
+    route = match.route
+    # router urls are regexes
+    route = route.replace("^", "").replace("$", "")
+    return f"{request.method} /{route}"
+
+
+class ProfilingMiddleware:
+    """
+    Profiles every request: SQL through connection.execute_wrapper (works
+    with DEBUG off), render time around TemplateResponse.render(), and
+    serializer time reported by ProfiledSerializerMixin / FastListMixin.
+    Adds a Server-Timing header, keeps the profile on `response.profile`
+    (handy with the test client) and aggregates it in `profile_stats`.
+    Enabled with settings.REQUEST_PROFILING.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                # connections.all() creates this thread's wrappers without
+                # connecting, so connections opened later are covered too
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        profile.total = (time.perf_counter() - profile.start) * 1000
+        response["Server-Timing"] = profile.server_timing()
+        response.profile = profile
+        profile_stats.record(endpoint_key(request), profile)
+        return response
+
+    def process_template_response(self, request, response):
+        # runs right before Django calls response.render()
+        profile = _current_profile.get()
+        if profile is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                profile.render += (time.perf_counter() - start) * 1000
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+# & serializers
+class ProfiledSerializerMixin:
+    """
+    Times `.data` (to_representation of the whole tree) into the
+    request profile.
+    """
+
+    @property
+    def data(self):
+        with profile_section("serialize"):
+            return super().data
+
+
+class ProfiledListSerializer(ProfiledSerializerMixin, serializers.ListSerializer):
+    pass
@@ -1,16 +1,18 @@
 from rest_framework import serializers
 
+from .url_builder import CachedHyperlinkedIdentityField
+
 
 class UserProductInlineSerializer(serializers.Serializer):
     title = serializers.CharField(read_only=True)
-    url = serializers.HyperlinkedIdentityField(
+    url = CachedHyperlinkedIdentityField(
         view_name="product-detail", lookup_field="pk"
     )
 
 
 class ProductInlineSerializer(serializers.Serializer):
     title = serializers.CharField(read_only=True)
-    url = serializers.HyperlinkedIdentityField(
+    url = CachedHyperlinkedIdentityField(
         view_name="product-detail", lookup_field="pk", read_only=True
     )
 
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token as Tkn
+
+from .authentication import invalidate_user, token_cache_key
+from .permission import bump_permission_version
+
+
+@receiver(post_delete, sender=Tkn)
+def invalidate_deleted_token(sender, instance, *args, **kwargs):
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_changed_user(sender, instance, *args, **kwargs):
+    invalidate_user(instance)
+
+
+@receiver(user_logged_out)
+def invalidate_logged_out_user(sender, request, user, *args, **kwargs):
+    if user is not None:
+        invalidate_user(user)
+
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Permission)
+def invalidate_permissions(sender, *args, **kwargs):
+    bump_permission_version()
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_permission_assignments(sender, action, *args, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_permission_version()
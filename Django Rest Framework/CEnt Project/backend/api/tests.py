@@ -1,3 +1,309 @@
-from django.test import TestCase
+import datetime
+import io
+import tempfile
+import uuid
+from decimal import Decimal
+from unittest import skipIf
 
-# Create your tests here.
+from django.contrib.auth.models import Group, Permission, User
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework import exceptions, renderers
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from drf_fastjson import FastJSONParser, FastJSONRenderer, orjson
+
+from products.models import Product
+from .authentication import SchemeAuthentication, jwt_user_cache_key, token_cache_key
+from .loadgen import compare, endpoint_name, load_scenario, percentile, summarize
+from .permission import PERMISSION_VERSION_KEY, get_permission_set
+from .profiling import profile_stats
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfileStatsTests(TestCase):
+    def setUp(self):
+        profile_stats.reset()
+
+    def test_routes_are_keyed_by_pattern(self):
+        self.client.get("/products/1/")
+        self.client.get("/products/2/")
+        self.assertEqual(profile_stats.snapshot()["GET /products/<int:pk>/"]["count"], 2)
+
+    def test_unresolved_paths_share_one_key(self):
+        for path in ["/nope/", "/nope/again/", "/random-123/"]:
+            self.client.get(path)
+        self.assertEqual(list(profile_stats.snapshot()), ["GET <unresolved>"])
+        self.assertEqual(profile_stats.snapshot()["GET <unresolved>"]["count"], 3)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("auth", password="pw")
+        self.token = Token.objects.create(user=self.user)
+        self.jwt = str(AccessToken.for_user(self.user))
+        self.auth = SchemeAuthentication()
+
+    def authenticate(self, credentials):
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {credentials}")
+        return self.auth.authenticate(request)
+
+    def assertRejected(self, credentials):
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate(credentials)
+
+    def cached(self):
+        return {
+            "token": cache.get(token_cache_key(self.token.key)) is not None,
+            "jwt": cache.get(jwt_user_cache_key(self.user.pk)) is not None,
+        }
+
+    def warm(self):
+        self.authenticate(self.token.key)
+        self.authenticate(self.jwt)
+        self.assertEqual(self.cached(), {"token": True, "jwt": True})
+
+    def test_second_request_is_served_from_the_cache(self):
+        for credentials in [self.token.key, self.jwt]:
+            with self.subTest(scheme="jwt" if "." in credentials else "token"):
+                self.assertEqual(self.authenticate(credentials)[0], self.user)
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.authenticate(credentials)[0], self.user)
+
+    def test_deleted_token(self):
+        self.warm()
+        self.token.delete()
+        self.assertRejected(self.token.key)
+
+    def test_deactivated_user(self):
+        self.warm()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.cached(), {"token": False, "jwt": False})
+        self.assertRejected(self.token.key)
+        self.assertRejected(self.jwt)
+
+    def test_cached_inactive_user_is_rejected(self):
+        # e.g. an entry written from a stale read, no signal left to drop it
+        self.warm()
+        inactive = User.objects.get(pk=self.user.pk)
+        inactive.is_active = False
+        cache.set(token_cache_key(self.token.key), (inactive, self.token))
+        cache.set(jwt_user_cache_key(self.user.pk), inactive)
+        self.assertRejected(self.token.key)
+        self.assertRejected(self.jwt)
+
+    def test_logout(self):
+        self.warm()
+        self.client.force_login(self.user)
+        self.client.post("/admin/logout/")
+        self.assertEqual(self.cached(), {"token": False, "jwt": False})
+
+    def test_password_change(self):
+        self.warm()
+        self.user.set_password("new password")
+        self.user.save()
+        self.assertEqual(self.cached(), {"token": False, "jwt": False})
+        user, _ = self.authenticate(self.token.key)
+        self.assertTrue(user.check_password("new password"))
+        self.assertTrue(self.authenticate(self.jwt)[0].check_password("new password"))
+
+
+class PermissionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("perms", password="pw")
+        self.group = Group.objects.create(name="editors")
+        self.change = Permission.objects.get(codename="change_product")
+        self.delete = Permission.objects.get(codename="delete_product")
+
+    def perms(self):
+        # a new request: fresh user object, nothing memoised on it
+        request = RequestFactory().get("/")
+        request.user = User.objects.get(pk=self.user.pk)
+        return get_permission_set(request)
+
+    def test_cached_across_requests_and_memoised_per_request(self):
+        self.user.user_permissions.add(self.change)
+        self.assertEqual(self.perms(), {"products.change_product"})
+        request = RequestFactory().get("/")
+        request.user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            get_permission_set(request)
+            get_permission_set(request)
+
+    def test_user_permission_changes(self):
+        self.perms()
+        self.user.user_permissions.add(self.change, self.delete)
+        self.assertEqual(self.perms(), {"products.change_product", "products.delete_product"})
+        self.user.user_permissions.remove(self.delete)
+        self.assertEqual(self.perms(), {"products.change_product"})
+        self.user.user_permissions.clear()
+        self.assertEqual(self.perms(), set())
+
+    def test_group_membership_changes(self):
+        self.group.permissions.add(self.change)
+        self.perms()
+        self.user.groups.add(self.group)
+        self.assertEqual(self.perms(), {"products.change_product"})
+        self.user.groups.remove(self.group)
+        self.assertEqual(self.perms(), set())
+        self.group.user_set.add(self.user)
+        self.assertEqual(self.perms(), {"products.change_product"})
+        self.group.user_set.clear()
+        self.assertEqual(self.perms(), set())
+
+    def test_group_permission_changes(self):
+        self.user.groups.add(self.group)
+        self.group.permissions.add(self.change)
+        self.assertEqual(self.perms(), {"products.change_product"})
+        self.group.permissions.remove(self.change)
+        self.assertEqual(self.perms(), set())
+        self.group.permissions.add(self.delete)
+        self.assertEqual(self.perms(), {"products.delete_product"})
+        self.group.delete()
+        self.assertEqual(self.perms(), set())
+
+    def test_revocation_after_the_version_key_was_evicted(self):
+        self.user.user_permissions.add(self.change)
+        self.assertEqual(self.perms(), {"products.change_product"})
+        cache.delete(PERMISSION_VERSION_KEY)
+        self.user.user_permissions.remove(self.change)
+        self.assertEqual(self.perms(), set())
+        cache.delete(PERMISSION_VERSION_KEY)
+        self.perms()  # a version created by a read, not a bump
+        self.user.user_permissions.add(self.change)
+        self.assertEqual(self.perms(), {"products.change_product"})
+
+
+class CachedModelPermissionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("editor", password="pw")
+        self.product = Product.objects.create(user=self.user, title="camera")
+        self.group = Group.objects.create(name="editors")
+        self.group.permissions.add(Permission.objects.get(codename="change_product"))
+        self.url = f"/products/{self.product.pk}/update/"
+
+    def rename(self, title):
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        return self.client.patch(self.url, {"title": title, "email": "e@example.com"}, format="json")
+
+    def test_revocation_takes_effect_on_the_next_request(self):
+        self.assertEqual(self.rename("first").status_code, 403)
+        self.user.groups.add(self.group)
+        self.assertEqual(self.rename("second").status_code, 200)
+        self.group.permissions.clear()
+        self.assertEqual(self.rename("third").status_code, 403)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).title, "second")
+
+
+@skipIf(orjson is None, "orjson is not installed")
+class FastJSONRendererTests(TestCase):
+    def assertSameAsDRF(self, data):
+        expected = renderers.JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_dates_and_times_are_formatted_by_drf(self):
+        moment = datetime.datetime(2025, 3, 4, 5, 6, 7, 891234)
+        self.assertSameAsDRF({
+            "utc": moment.replace(tzinfo=datetime.timezone.utc),
+            "offset": moment.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+            "naive": moment,
+            "whole": moment.replace(microsecond=0),
+            "date": moment.date(),
+            "time": moment.time(),
+        })
+
+    def test_aware_times_are_rejected_like_drf(self):
+        aware = datetime.time(5, 6, tzinfo=datetime.timezone.utc)
+        with self.assertRaises(ValueError):
+            renderers.JSONRenderer().render({"t": aware})
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({"t": aware})
+
+    def test_other_types_match(self):
+        self.assertSameAsDRF({
+            "price": Decimal("19.90"),
+            "id": uuid.UUID(int=7),
+            "duration": datetime.timedelta(minutes=3),
+            "text": "caf\u00e9 \u2028 \u2029 </script>",
+            1: [True, None, 1.5],
+        })
+
+    def test_non_finite_floats_render_as_null(self):
+        with self.assertRaises(ValueError):
+            renderers.JSONRenderer().render({"x": float("nan")})
+        self.assertEqual(FastJSONRenderer().render({"x": float("nan")}), b'{"x":null}')
+
+    def test_parser_round_trip(self):
+        body = FastJSONRenderer().render({"title": "x", "price": Decimal("1.50")})
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), {"title": "x", "price": 1.5})
+
+
+class LoadgenReportTests(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        values = [float(n) for n in range(1, 11)]
+        self.assertEqual(percentile(values, 50), 5.0)
+        self.assertEqual(percentile(values, 95), 10.0)
+        self.assertEqual(percentile(values, 10), 1.0)
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile(values, 100), 10.0)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_summarize(self):
+        samples = [
+            ("GET /products/", 200, 0.010, 100),
+            ("GET /products/", 200, 0.030, 300),
+            ("GET /products/", 500, 0.020, 200),
+            ("GET /products/{id}/", 404, 0.001, 10),
+            ("GET /products/{id}/", 0, 0.003, 0),
+        ]
+        summary = summarize(samples, wall_time=2.0)
+        self.assertEqual(set(summary), {"GET /products/", "GET /products/{id}/", "ALL"})
+        products = summary["GET /products/"]
+        self.assertEqual((products["count"], products["errors"], products["bytes"]), (3, 1, 200))
+        self.assertAlmostEqual(products["p50"], 20.0)
+        self.assertAlmostEqual(products["p99"], 30.0)
+        self.assertAlmostEqual(products["mean"], 20.0)
+        self.assertAlmostEqual(products["rps"], 1.5)
+        self.assertEqual(summary["GET /products/{id}/"]["errors"], 2)
+        self.assertEqual((summary["ALL"]["count"], summary["ALL"]["errors"]), (5, 3))
+        self.assertAlmostEqual(summary["ALL"]["p50"], 10.0)
+        self.assertEqual(summarize(samples, wall_time=0)["ALL"]["rps"], 0.0)
+
+    def test_compare(self):
+        row = {"p50": 10.0, "p95": 20.0, "p99": 0.0, "rps": 50.0}
+        baseline = {"GET /a/": row, "GET /gone/": row}
+        current = {"GET /a/": {"p50": 5.0, "p95": 30.0, "p99": 4.0, "rps": 100.0}, "GET /new/": row}
+        report = compare(baseline, current)
+        self.assertEqual(list(report), ["GET /a/"])
+        self.assertEqual(
+            report["GET /a/"],
+            {
+                "p50": (10.0, 5.0, -50.0),
+                "p95": (20.0, 30.0, 50.0),
+                "p99": (0.0, 4.0, 0.0),
+                "rps": (50.0, 100.0, 100.0),
+            },
+        )
+
+    def test_load_scenario(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as scenario:
+            scenario.write('# comment\n\n{"path": "/products/12/?limit=5"}\n{"method": "post", "path": "/x/", "name": "n"}\n')
+            scenario.flush()
+            entries = load_scenario(scenario.name)
+        self.assertEqual([entry["name"] for entry in entries], ["GET /products/{id}/", "n"])
+        self.assertEqual(entries[1]["method"], "POST")
+        self.assertEqual(endpoint_name("GET", "/products/7"), "GET /products/{id}")
+
+    def test_load_scenario_bad_line(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as scenario:
+            scenario.write('{"path": "/a/"}\n{nope\n')
+            scenario.flush()
+            with self.assertRaisesRegex(ValueError, r":2: ") as raised:
+                load_scenario(scenario.name)
+        self.assertIsInstance(raised.exception.__cause__, ValueError)
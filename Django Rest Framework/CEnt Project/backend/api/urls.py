@@ -15,6 +15,7 @@ urlpatterns = [
     path("api_model/", api_model, name="api_model"),
     path("drf_view/", drf_view, name="drf_view"),
     path("post_view/", post_view, name="post_view"),
+    path("profiling/", profiling_stats, name="profiling_stats"),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("token/verify/", TokenVerifyView.as_view(), name="token_refresh"),
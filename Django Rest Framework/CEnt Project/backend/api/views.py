@@ -3,11 +3,13 @@ import json
 from django.http import JsonResponse, HttpResponse
 from django.forms.models import model_to_dict
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from products.models import *
 from products.serializers import *
 
 from rest_framework import generics
+from .profiling import profile_stats
 
 
 # & JsonResponse
@@ -31,7 +33,7 @@ def api_home(request, *args, **kwargs):
 
 # & Using HttpResponse
 def api_model(request, *args, **kwargs):
-    model_data = Product.objects.all().order_by("?").first()
+    model_data = Product.objects.random()
     data = {}
     if model_data:
         # data["title"] = model_data.title
@@ -55,7 +57,7 @@ def api_model(request, *args, **kwargs):
 def drf_view(request, *args, **kwargs):
     # if request.method != "POST":
     #     return Response({"detail": "GET not allowed "}, status=405)
-    model_data = Product.objects.all().order_by("?").first()
+    model_data = Product.objects.random()
     data = {}
     if model_data:
         # data = model_to_dict(
@@ -75,3 +77,12 @@ def post_view(request, *args, **kwargs):
         # serializer.save()
         print(serializer.data)
         return Response(serializer.data)
+
+
+# & Per endpoint request profile (api/profiling.py), DELETE resets it
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def profiling_stats(request, *args, **kwargs):
+    if request.method == "DELETE":
+        profile_stats.reset()
+    return Response(profile_stats.snapshot())
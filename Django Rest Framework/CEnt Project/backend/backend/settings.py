@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import sys
 from dotenv import load_dotenv
 import os
 
@@ -18,6 +19,11 @@ load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# modules shared between the DRF projects ("Django Rest Framework/shared")
+SHARED_DIR = BASE_DIR.parent.parent / "shared"
+if str(SHARED_DIR) not in sys.path:
+    sys.path.append(str(SHARED_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -53,6 +59,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # outermost, so its totals include every other middleware
+    "api.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -62,6 +70,9 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Server-Timing headers + /api/profiling/ stats (api/profiling.py)
+REQUEST_PROFILING = DEBUG
+
 ROOT_URLCONF = "backend.urls"
 
 TEMPLATES = [
@@ -93,6 +104,27 @@ DATABASES = {
 }
 
 
+# Cache
+# per-user product list pages (api/cache.py): Redis in prod, local memory otherwise
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -138,14 +170,23 @@ APPEND_SLASH = True
 
 
 REST_FRAMEWORK = {
+    # session / JWT / token, picked from the Authorization header (api/authentication.py)
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.SessionAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "api.authentication.TokenAuthentication",
+        "api.authentication.SchemeAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 3,
+    # orjson when installed, stdlib json otherwise (shared/drf_fastjson.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "drf_fastjson.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "drf_fastjson.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 # jwt config
@@ -160,10 +201,33 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
 }
 
+# seconds a resolved token -> user / JWT sub -> user stays cached
+AUTH_CACHE_TIMEOUT = 60
+
 # third party api config
 
 ALGOLIA = {
     "APPLICATION_ID": os.getenv("ALGOLIA_APP_ID"),
     "API_KEY": os.getenv("ALGOLIA_API_KEY"),
     "INDEX_PREFIX": "root",
+    # products are pushed by the search outbox worker, not on every save
+    "AUTO_INDEXING": False,
 }
+
+SEARCH_INDEX_OUTBOX = {
+    "BATCH_SIZE": 500,
+    "DEBOUNCE_SECONDS": 2,
+    "MAX_DELAY_SECONDS": 30,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_BACKOFF_SECONDS": 5,
+}
+
+# full text search for Product.objects.search()
+# None -> picked from the database vendor (sqlite FTS5 / postgres tsvector)
+# e.g. "products.search_backends.IContainsSearchBackend"
+PRODUCT_SEARCH_BACKEND = None
+
+# search/client.perform_search engine: "algolia" or "local" (in-process index)
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "algolia")
+LOCAL_SEARCH_INDEX_PATH = BASE_DIR / "local_search_index.json"
+LOCAL_SEARCH_INDEX_REFRESH_SECONDS = 5
@@ -1,9 +1,19 @@
+import hashlib
+import json
+
 from algoliasearch_django import AlgoliaIndex
 from algoliasearch_django.decorators import register
+from django.core.serializers.json import DjangoJSONEncoder
 
 from .models import Product
 
 
+def record_hash(record):
+    """Content hash of an index record, stable across processes."""
+    payload = json.dumps(record, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
 @register(Product)
 class ProductIndex(AlgoliaIndex):
     should_index = "is_public"
@@ -15,3 +25,32 @@ class ProductIndex(AlgoliaIndex):
         "public",
     ]
     tags = "get_tags_list"
+
+    def get_changes(self, instance):
+        """
+        (record, hash) if the indexed fields of `instance` differ from
+        what was last pushed, else (None, hash).
+        """
+        record = self.get_raw_record(instance)
+        new_hash = record_hash(record)
+        if new_hash == instance.index_hash:
+            return None, new_hash
+        return record, new_hash
+
+    def save_record(self, instance, update_fields=None, **kwargs):
+        # skip the network write when nothing that is indexed changed
+        if update_fields is None and self._should_index(instance):
+            record, new_hash = self.get_changes(instance)
+            if record is None:
+                return
+            super().save_record(instance, update_fields, **kwargs)
+            Product.objects.filter(pk=instance.pk).update(index_hash=new_hash)
+            instance.index_hash = new_hash
+            return
+        return super().save_record(instance, update_fields, **kwargs)
+
+    def delete_record(self, instance):
+        super().delete_record(instance)
+        if instance.pk is not None and instance.index_hash:
+            Product.objects.filter(pk=instance.pk).update(index_hash="")
+            instance.index_hash = ""
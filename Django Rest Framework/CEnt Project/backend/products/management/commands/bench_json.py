@@ -0,0 +1,59 @@
+import json
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from drf_fastjson import FastJSONParser, FastJSONRenderer, orjson
+from products.models import Product
+from products.serializers import ProductFastListSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's JSONRenderer/JSONParser with FastJSONRenderer/FastJSONParser on a product list payload."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def timed(self, run, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return (time.perf_counter() - start) / repeat
+
+    def handle(self, *args, **options):
+        # APIRequestFactory requests come from "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            self.bench(**options)
+
+    def bench(self, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson not installed, Fast* classes use the stdlib"))
+        request = Request(APIRequestFactory().get("/products/"))
+        serializer = ProductFastListSerializer(context={"request": request})
+        rows = list(serializer.prepare(Product.objects.order_by("id")[: options["rows"]]))
+        payload = {"count": len(rows), "next": None, "previous": None, "results": serializer.serialize(rows)}
+
+        drf_body = JSONRenderer().render(payload)
+        fast_body = FastJSONRenderer().render(payload)
+        if json.loads(drf_body) != json.loads(fast_body):
+            self.stderr.write(self.style.ERROR("Rendered payloads differ"))
+            return
+        self.stdout.write(f"payload: {len(payload['results'])} products, {len(drf_body)} bytes")
+
+        repeat = options["repeat"]
+        for label, slow, fast in [
+            ("render", lambda: JSONRenderer().render(payload), lambda: FastJSONRenderer().render(payload)),
+            ("parse", lambda: JSONParser().parse(BytesIO(drf_body)), lambda: FastJSONParser().parse(BytesIO(drf_body))),
+        ]:
+            slow_t, fast_t = self.timed(slow, repeat), self.timed(fast, repeat)
+            self.stdout.write(
+                f"{label:<7} stdlib {slow_t * 1000:7.2f} ms   fast {fast_t * 1000:7.2f} ms   {slow_t / fast_t:5.1f}x"
+            )
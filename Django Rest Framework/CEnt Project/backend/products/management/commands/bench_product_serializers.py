@@ -0,0 +1,57 @@
+import time
+
+from django.core.cache import cache
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+
+from products.models import Product
+from products.serializers import ProductFastListSerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ProductSerializer(many=True) with ProductFastListSerializer "
+        "on the first N products: checks the JSON is identical and prints rows/s."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        # APIRequestFactory requests come from "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            self.bench(**options)
+
+    def bench(self, **options):
+        request = Request(APIRequestFactory().get("/products/"))
+        context = {"request": request}
+        queryset = Product.objects.with_pricing().order_by("id")[: options["rows"]]
+        render = JSONRenderer().render
+
+        def drf():
+            return ProductSerializer(queryset.select_related("user"), many=True, context=context).data
+
+        def fast():
+            serializer = ProductFastListSerializer(context=context)
+            return serializer.serialize(list(serializer.prepare(queryset)))
+
+        if render(drf()) != render(fast()):
+            self.stderr.write(self.style.ERROR("Output differs between the two serializers"))
+            return
+
+        results = {}
+        for name, run in [("ProductSerializer", drf), ("ProductFastListSerializer", fast)]:
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                cache.clear()
+                rows = len(run())
+            elapsed = (time.perf_counter() - start) / options["repeat"]
+            results[name] = elapsed
+            self.stdout.write(f"{name:<28} {elapsed * 1000:8.1f} ms  {rows / elapsed:10.0f} rows/s")
+        speedup = results["ProductSerializer"] / results["ProductFastListSerializer"]
+        self.stdout.write(self.style.SUCCESS(f"Identical JSON, {speedup:.1f}x faster"))
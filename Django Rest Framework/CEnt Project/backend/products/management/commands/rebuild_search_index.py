@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search_backends import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full text search index for all products."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild(Product.objects.all())
+        self.stdout.write(
+            self.style.SUCCESS(f"Search index rebuilt with {backend.__class__.__name__}")
+        )
@@ -0,0 +1,64 @@
+from algoliasearch_django import algolia_engine
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from search.client import get_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Push to the search index only the products whose indexed fields "
+        "changed since the last push (compared by content hash)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        adapter = algolia_engine.get_adapter(Product)
+        index = get_index(adapter.index_name)
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        records, hashes, removed = [], {}, []
+        pushed = unchanged = 0
+
+        def flush():
+            nonlocal pushed
+            if not dry_run:
+                if records:
+                    index.save_objects(records)
+                if removed:
+                    index.delete_objects(removed)
+                Product.objects.bulk_update(
+                    [Product(pk=pk, index_hash=new_hash) for pk, new_hash in hashes.items()],
+                    ["index_hash"],
+                )
+            pushed += len(records) + len(removed)
+            records.clear()
+            hashes.clear()
+            removed.clear()
+
+        qs = Product.objects.select_related("user").order_by("pk")
+        for product in qs.iterator(chunk_size=batch_size):
+            if not adapter._should_index(product):
+                # was indexed before, has to go
+                if product.index_hash:
+                    removed.append(product.pk)
+                    hashes[product.pk] = ""
+            else:
+                record, new_hash = adapter.get_changes(product)
+                if record is None:
+                    unchanged += 1
+                else:
+                    records.append(record)
+                    hashes[product.pk] = new_hash
+            if len(records) + len(removed) >= batch_size:
+                flush()
+        flush()
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(
+            self.style.SUCCESS(f"{prefix}{pushed} products pushed, {unchanged} unchanged")
+        )
@@ -0,0 +1,49 @@
+# Full text search index for Product.search()
+#  sqlite     -> FTS5 virtual table products_product_fts (rowid = product id)
+#  postgresql -> search_vector tsvector column + GIN index
+
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts "
+    "USING fts5(title, content, tokenize='unicode61')",
+    "INSERT INTO products_product_fts (rowid, title, content) "
+    "SELECT id, coalesce(title, ''), coalesce(content, '') FROM products_product",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS products_product_fts"]
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE products_product ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "UPDATE products_product SET search_vector = "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+    "CREATE INDEX IF NOT EXISTS products_product_search_vector_gin "
+    "ON products_product USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS products_product_search_vector_gin",
+    "ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_public'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run_for_vendor({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
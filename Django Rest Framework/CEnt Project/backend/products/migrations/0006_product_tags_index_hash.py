@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-19 09:00
+
+import re
+import zlib
+
+from django.db import migrations, models
+
+
+# frozen copy of products.models.compute_tags as of this migration, so
+# later changes to the live function don't rewrite history
+TAGS_MODEL_VALUES = ["electronics", "cameras", "cars", "boats", "movies"]
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def compute_tags(title, content=None):
+    words = {word.lower() for word in TOKEN_RE.findall(f"{title or ''} {content or ''}")}
+    tags = [tag for tag in TAGS_MODEL_VALUES if tag in words or tag[:-1] in words]
+    if not tags:
+        checksum = zlib.crc32((title or "").lower().encode("utf-8"))
+        tags = [TAGS_MODEL_VALUES[checksum % len(TAGS_MODEL_VALUES)]]
+    return tags
+
+
+def fill_tags(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+    products = list(Product.objects.only("id", "title", "content"))
+    for product in products:
+        product.tags = compute_tags(product.title, product.content)
+    Product.objects.bulk_update(products, ["tags"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='tags',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='index_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(fill_tags, migrations.RunPython.noop),
+    ]
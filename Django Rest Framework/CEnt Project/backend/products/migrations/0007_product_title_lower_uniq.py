@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-19 08:18
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def dedupe_titles(apps, schema_editor):
+    # older rows were only checked by the (racy) iexact validator
+    # keyed by the database's LOWER(), the function the constraint uses
+    Product = apps.get_model("products", "Product")
+    seen = set()
+    duplicates = []
+    qs = Product.objects.annotate(title_lower=Lower("title")).only("id", "title").order_by("id")
+    for product in qs:
+        key = product.title_lower
+        if key in seen:
+            product.title = f"{product.title[:110]} ({product.id})"
+            duplicates.append(product)
+        seen.add(key)
+    Product.objects.bulk_update(duplicates, ["title"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_tags_index_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('title'), name='products_product_title_lower_uniq'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 from django.db import models
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import F, Max, Min
+from django.db.models.functions import Lower, Round
 from decimal import Decimal
 import random
+import zlib
+
+from .search_backends import get_search_backend, tokenize
 
 # Create your models here.
 
@@ -10,17 +14,46 @@ User = settings.AUTH_USER_MODEL  # auth.User
 
 TAGS_MODEL_VALUES = ["electronics", "cameras", "cars", "boats", "movies"]
 
+SALE_RATE = Decimal("0.8")
+CENTS = Decimal("0.01")
+
+
+def compute_tags(title, content=None):
+    """
+    Deterministic tags for a product: every tag whose name (or singular,
+    "cameras" -> "camera") appears as a word in the title/content.
+    Falls back to one tag picked by a stable hash of the title.
+    """
+    words = {word.lower() for word in tokenize(f"{title or ''} {content or ''}")}
+    tags = [tag for tag in TAGS_MODEL_VALUES if tag in words or tag[:-1] in words]
+    if not tags:
+        checksum = zlib.crc32((title or "").lower().encode("utf-8"))
+        tags = [TAGS_MODEL_VALUES[checksum % len(TAGS_MODEL_VALUES)]]
+    return tags
+
 
 class ProductQuerySet(models.QuerySet):
     def is_public(self):
         return self.filter(public=True)
 
+    def with_pricing(self):
+        """
+        sale_price and discount computed by the database, so serializing
+        a list page reads plain attributes instead of doing the math per row.
+        """
+        money = models.DecimalField(max_digits=15, decimal_places=2)
+        sale_price = Round(F("price") * SALE_RATE, 2, output_field=money)
+        return self.annotate(
+            sale_price=sale_price,
+            discount=models.ExpressionWrapper(F("price") - sale_price, output_field=money),
+        )
+
     def search(self, query, user=None):
-        lookup = Q(title__icontains=query) | Q(content__icontains=query)
-        qs = self.is_public().filter(lookup)
+        # ranked full text search, see search_backends.py
+        qs = get_search_backend().search(self.is_public(), query)
 
         if user is not None:
-            qs2 = self.is_public().filter(lookup).filter(user=user)
+            qs2 = qs.filter(user=user)
             return qs2
         return qs
         # qs = self.is_public().filter(lookup)
@@ -30,10 +63,38 @@ class ProductQuerySet(models.QuerySet):
         # return qs
 
 
+    def random(self, tries=3):
+        """
+        One random row without ORDER BY RANDOM() (which sorts the whole table).
+        Picks a random id in [min_id, max_id] and probes the primary key;
+        after `tries` misses (gaps from deleted rows) takes the next id up,
+        or the one below it.
+        """
+        bounds = self.aggregate(min_id=Min("id"), max_id=Max("id"))
+        min_id, max_id = bounds["min_id"], bounds["max_id"]
+        if min_id is None:
+            return None
+        for _ in range(tries):
+            obj = self.filter(id=random.randint(min_id, max_id)).first()
+            if obj is not None:
+                return obj
+        pivot = random.randint(min_id, max_id)
+        obj = self.filter(id__gte=pivot).order_by("id").first()
+        if obj is None:
+            obj = self.filter(id__lt=pivot).order_by("-id").first()
+        return obj
+
+
 class ProductManager(models.Manager):
     def get_queryset(self, *args, **kwargs):
         return ProductQuerySet(self.model, using=self._db)
 
+    def random(self, tries=3):
+        return self.get_queryset().random(tries=tries)
+
+    def with_pricing(self):
+        return self.get_queryset().with_pricing()
+
     def search(self, query, user=None):
 
         return self.get_queryset().search(query, user=user)
@@ -45,20 +106,51 @@ class Product(models.Model):
     content = models.TextField(blank=True, null=True)
     price = models.DecimalField(max_digits=15, decimal_places=2, default=23.4)
     public = models.BooleanField(default=True)
+    tags = models.JSONField(default=list, blank=True)
+    # ETag / Last-Modified for the list and detail views
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # hash of the last record pushed to the search index (see index.py)
+    index_hash = models.CharField(max_length=40, blank=True, default="", editable=False)
     objects = ProductManager()
 
+    class Meta:
+        constraints = [
+            # case-insensitive unique titles, also the index validate_title probes
+            models.UniqueConstraint(Lower("title"), name="products_product_title_lower_uniq"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # tags are computed once per write, not on every index sync
+        self.tags = compute_tags(self.title, self.content)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "tags" not in update_fields:
+            kwargs["update_fields"] = {*update_fields, "tags"}
+        super().save(*args, **kwargs)
+        # annotated prices (with_pricing) are stale once price may have changed
+        self.__dict__.pop("_sale_price", None)
+        self.__dict__.pop("discount", None)
+
     def is_public(self) -> bool:
         return self.public
 
     def get_tags_list(self):
-        return [random.choice(TAGS_MODEL_VALUES)]
+        return list(self.tags)
 
     @property
     def sale_price(self):
-        return "%.2f" % (float(self.price) * 0.8)
+        # set by ProductQuerySet.with_pricing(), sqlite hands back extra digits
+        if "_sale_price" in self.__dict__:
+            return self._sale_price.quantize(CENTS)
+        return (Decimal(self.price) * SALE_RATE).quantize(CENTS)
+
+    @sale_price.setter
+    def sale_price(self, value):
+        self._sale_price = value
 
     def get_discount(self):
-        return Decimal(self.price) - Decimal(self.sale_price)
+        if "discount" in self.__dict__:
+            return self.discount.quantize(CENTS)
+        return Decimal(self.price) - self.sale_price
 
     @property
     def usr(self):
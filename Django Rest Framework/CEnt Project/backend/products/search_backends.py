@@ -0,0 +1,175 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+FTS_TABLE = "products_product_fts"
+PG_CONFIG = "english"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query or "")
+
+
+class BaseSearchBackend:
+    """
+    A search backend turns a free text query into a filtered,
+    ranked Product queryset and keeps its own index in sync
+    with the products table.
+    """
+
+    def search(self, qs, query):
+        raise NotImplementedError
+
+    def index_product(self, product):
+        pass
+
+    def index_products(self, products):
+        for product in products:
+            self.index_product(product)
+
+    def remove_product(self, pk):
+        pass
+
+    def rebuild(self, queryset):
+        for product in queryset.iterator():
+            self.index_product(product)
+
+
+# & fallback: sequential LIKE '%q%' scan (old behaviour)
+class IContainsSearchBackend(BaseSearchBackend):
+    def search(self, qs, query):
+        lookup = Q(title__icontains=query) | Q(content__icontains=query)
+        return qs.filter(lookup)
+
+
+# & SQLite FTS5 virtual table (dev)
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    Uses the `products_product_fts` FTS5 table created in migration
+    0005. The rowid of the fts table is the product id.
+    """
+
+    def match_expression(self, query):
+        # quote every token so user input can never be read as FTS syntax,
+        # and allow prefix matches on each term ("cam" -> "camera")
+        tokens = tokenize(query)
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    def search(self, qs, query):
+        match = self.match_expression(query)
+        if not match:
+            return qs.none()
+        # join the fts table once: a single MATCH filters the rows and
+        # feeds bm25() (smaller is better, so ascending order is best first)
+        return qs.extra(
+            select={"rank": f"bm25({FTS_TABLE}, 2.0, 1.0)"},
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = products_product.id", f"{FTS_TABLE} MATCH %s"],
+            params=[match],
+        ).order_by("rank", "id")
+
+    def index_product(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)",
+                [product.pk, product.title or "", product.content or ""],
+            )
+
+    def index_products(self, products):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [[p.pk] for p in products]
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)",
+                [[p.pk, p.title or "", p.content or ""] for p in products],
+            )
+
+    def remove_product(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+
+    def rebuild(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        super().rebuild(queryset)
+
+
+# & PostgreSQL tsvector column + GIN index (prod)
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Uses the `search_vector` tsvector column and its GIN index added
+    in migration 0005. Title is weighted above content.
+    """
+
+    vector_sql = (
+        f"setweight(to_tsvector('{PG_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{PG_CONFIG}', coalesce(content, '')), 'B')"
+    )
+
+    def tsquery(self, query):
+        tokens = tokenize(query)
+        return " & ".join(f"{token}:*" for token in tokens)
+
+    def search(self, qs, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return qs.none()
+        matched = RawSQL(
+            f"products_product.search_vector @@ to_tsquery('{PG_CONFIG}', %s)",
+            (tsquery,),
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank(products_product.search_vector, to_tsquery('{PG_CONFIG}', %s))",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+        return (
+            qs.annotate(matched=matched, rank=rank)
+            .filter(matched=True)
+            .order_by("-rank", "id")
+        )
+
+    def index_product(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE products_product SET search_vector = {self.vector_sql} WHERE id = %s",
+                [product.pk],
+            )
+
+    def index_products(self, products):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE products_product SET search_vector = {self.vector_sql} WHERE id = ANY(%s)",
+                [[product.pk for product in products]],
+            )
+
+    def rebuild(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE products_product SET search_vector = {self.vector_sql}")
+
+
+VENDOR_BACKENDS = {
+    "sqlite": SQLiteFTSSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    settings.PRODUCT_SEARCH_BACKEND can point to a backend class,
+    otherwise it is picked from the database vendor.
+    """
+    path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    backend_class = VENDOR_BACKENDS.get(connection.vendor, IContainsSearchBackend)
+    return backend_class()
@@ -1,26 +1,30 @@
+from django.db import IntegrityError
 from rest_framework import serializers
 from .models import *
-from rest_framework.reverse import reverse
 from .validators import *
 from api.serializers import *
+from api.url_builder import CachedHyperlinkedIdentityField, get_url_builder
+from api.profiling import ProfiledListSerializer, ProfiledSerializerMixin
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(ProfiledSerializerMixin, serializers.ModelSerializer):
     owner = UserPublicSerializer(source="user", read_only=True)
     related_products = ProductInlineSerializer(
         source="user.product_set.all", read_only=True, many=True
     )
     my_discount = serializers.SerializerMethodField(read_only=True)
     url = serializers.SerializerMethodField(read_only=True)
-    edit_url = serializers.HyperlinkedIdentityField(
+    edit_url = CachedHyperlinkedIdentityField(
         view_name="product-edit", lookup_field="pk"
     )
     email = serializers.EmailField(write_only=True)
     title = serializers.CharField(validators=[validate_title, title_no_hello])
     name = serializers.CharField(source="title", read_only=True)
+    sale_price = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
 
     class Meta:
         model = Product
+        list_serializer_class = ProfiledListSerializer
         fields = [
             "id",
             "url",
@@ -50,18 +54,29 @@ class ProductSerializer(serializers.ModelSerializer):
     # & create and update methods in model serializer
     def create(self, validated_data):
         email = validated_data.pop("email")
-        instance = super().create(validated_data)
+        try:
+            instance = super().create(validated_data)
+        except IntegrityError:
+            # lost a race against another request with the same title
+            raise serializers.ValidationError(
+                {"title": [f"{validated_data.get('title')} is already exists as product name"]}
+            )
         return instance
 
     def update(self, instance, validated_data):
         email = validated_data.pop("email")
-        return super().update(instance, validated_data)
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"title": [f"{validated_data.get('title')} is already exists as product name"]}
+            )
 
     def get_url(self, obj):
         request = self.context.get("request")
         if request is None:
             return None
-        return reverse("product-detail", kwargs={"pk": obj.pk}, request=request)
+        return get_url_builder(request).url("product-detail", obj.pk)
 
     def get_my_discount(self, obj):
         if not hasattr(obj, "id"):
@@ -69,3 +84,85 @@ class ProductSerializer(serializers.ModelSerializer):
         if not isinstance(obj, Product):
             return None
         return obj.get_discount()
+
+
+# & read only fast path for list endpoints, same JSON as ProductSerializer
+class ProductFastListSerializer:
+    """
+    Builds ProductSerializer's list output from .values() rows and plain
+    dicts: one query for the page, one for every owner's products.
+    Pair with FastListMixin (api/mixins.py) on a view to enable it.
+    """
+
+    value_fields = ["id", "title", "content", "price", "user_id", "user__username"]
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    def prepare(self, queryset):
+        if "sale_price" not in queryset.query.annotations:
+            queryset = queryset.with_pricing()
+        return queryset.values(*self.value_fields, "sale_price", "discount")
+
+    def serialize(self, rows):
+        urls = get_url_builder(self.context["request"])
+        detail_url = lambda pk: urls.url("product-detail", pk)
+
+        user_ids = {row["user_id"] for row in rows if row["user_id"] is not None}
+        owned = {user_id: [] for user_id in user_ids}
+        related_qs = Product.objects.filter(user_id__in=user_ids).order_by("id")
+        for user_id, pk, title in related_qs.values_list("user_id", "id", "title"):
+            owned[user_id].append({"title": title, "url": detail_url(pk)})
+
+        data = []
+        for row in rows:
+            pk = row["id"]
+            item = {
+                "id": pk,
+                "url": detail_url(pk),
+                "owner": None,
+                "edit_url": urls.url("product-edit", pk),
+                "title": row["title"],
+                "content": row["content"],
+                "price": "{:f}".format(row["price"].quantize(CENTS)),
+                "sale_price": "{:f}".format(row["sale_price"].quantize(CENTS)),
+                "my_discount": row["discount"].quantize(CENTS),
+                "name": row["title"],
+            }
+            user_id = row["user_id"]
+            if user_id is not None:
+                products = owned[user_id]
+                item["owner"] = {
+                    "username": row["user__username"],
+                    "other_products": products,
+                }
+                # DRF skips the field when product.user is None
+                item["related_products"] = products
+            data.append(item)
+        return data
+
+
+# & one item of a bulk request, title uniqueness is checked for the whole batch
+class ProductBulkItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+    title = serializers.CharField(max_length=120, validators=[title_no_hello])
+
+    class Meta:
+        model = Product
+        fields = ["id", "title", "content", "price", "public"]
+
+
+# & flat serializer for the streaming export, no DRF field machinery per row
+class ProductExportSerializer:
+    fields = ["id", "title", "content", "price", "public", "tags", "user_id"]
+    related_fields = {"owner": "user__username"}
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def rows(self, chunk_size=2000):
+        columns = self.fields + list(self.related_fields.values())
+        names = self.fields + list(self.related_fields)
+        qs = self.queryset.order_by("pk").values_list(*columns)
+        for values in qs.iterator(chunk_size=chunk_size):
+            yield dict(zip(names, values))
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from api.cache import bump_user_version
+from .models import Product
+from .search_backends import get_search_backend
+
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, *args, **kwargs):
+    get_search_backend().index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, *args, **kwargs):
+    get_search_backend().remove_product(instance.pk)
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_owner(sender, instance, *args, **kwargs):
+    if instance.pk is None or instance._state.adding:
+        instance._previous_user_id = None
+        return
+    instance._previous_user_id = (
+        Product.objects.filter(pk=instance.pk).values_list("user_id", flat=True).first()
+    )
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_user_product_list(sender, instance, *args, **kwargs):
+    bump_user_version(instance.user_id)
+    # a reassigned product also leaves its previous owner's list
+    previous = getattr(instance, "_previous_user_id", None)
+    if previous is not None and previous != instance.user_id:
+        bump_user_version(previous)
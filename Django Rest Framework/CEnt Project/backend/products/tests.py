@@ -1,3 +1,874 @@
-from django.test import TestCase
+import importlib
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from algoliasearch_django import algolia_engine
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.apps import apps
+from rest_framework import serializers
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from .models import Product, compute_tags
+from .serializers import ProductFastListSerializer
+from .validators import existing_titles, title_keys, validate_title
+from .views import ProductExportAPIView
+from .viewsets import ProductViewSet
+from .search_backends import FTS_TABLE, IContainsSearchBackend, get_search_backend
+
+
+class ProductBulkAPITests(APITestCase):
+    url = "/products/bulk/"
+
+    def setUp(self):
+        self.user = User.objects.create_superuser("bulk", "bulk@example.com", "pw")
+        self.client.force_authenticate(self.user)
+
+    def test_create(self):
+        response = self.client.post(
+            self.url,
+            [{"title": "camera one", "price": "10.00"}, {"title": "boat two"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["errors"], [])
+        self.assertEqual([item["title"] for item in response.data["results"]], ["camera one", "boat two"])
+        camera = Product.objects.get(title="camera one")
+        self.assertEqual(camera.user, self.user)
+        self.assertEqual(camera.content, "camera one")
+        self.assertEqual(camera.tags, ["cameras"])
+
+    def test_create_reports_invalid_items_with_207(self):
+        Product.objects.create(user=self.user, title="Taken")
+        response = self.client.post(
+            self.url,
+            [
+                {"title": "fine"},
+                {"title": "hello world"},
+                {"title": "taken"},
+                {"price": "1.00"},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item["title"] for item in response.data["results"]], ["fine"])
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2, 3])
+        self.assertIn("title", response.data["errors"][1]["errors"])
+        self.assertFalse(Product.objects.filter(title="hello world").exists())
+
+    def test_create_duplicate_titles_in_one_batch(self):
+        response = self.client.post(
+            self.url, [{"title": "Twin"}, {"title": "twin"}, {"title": "other"}], format="json"
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item["title"] for item in response.data["results"]], ["Twin", "other"])
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertEqual(Product.objects.filter(title__iexact="twin").count(), 1)
+
+    def test_patch(self):
+        first = Product.objects.create(user=self.user, title="first", price=1)
+        second = Product.objects.create(user=self.user, title="second", price=2)
+        before = second.updated_at
+        response = self.client.patch(
+            self.url,
+            [{"id": first.pk, "price": "5.00"}, {"id": second.pk, "title": "second camera"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(str(first.price), "5.00")
+        self.assertEqual(first.title, "first")
+        self.assertEqual(second.title, "second camera")
+        self.assertEqual(second.tags, ["cameras"])
+        self.assertGreater(second.updated_at, before)
+
+    def test_patch_errors(self):
+        mine = Product.objects.create(user=self.user, title="mine")
+        other = User.objects.create_user("other", password="pw")
+        theirs = Product.objects.create(user=other, title="theirs")
+        Product.objects.create(user=self.user, title="existing")
+        response = self.client.patch(
+            self.url,
+            [
+                {"id": mine.pk, "content": "updated"},
+                {"id": theirs.pk, "title": "stolen"},
+                {"id": 999999, "title": "missing"},
+                {"id": mine.pk, "title": "Existing"},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2, 3])
+        self.assertEqual(response.data["errors"][0]["errors"], {"id": ["Product not found."]})
+        self.assertEqual(Product.objects.get(pk=mine.pk).content, "updated")
+        self.assertEqual(Product.objects.get(pk=theirs.pk).title, "theirs")
+
+    def test_patch_duplicate_titles_in_one_batch(self):
+        first = Product.objects.create(user=self.user, title="first")
+        second = Product.objects.create(user=self.user, title="second")
+        response = self.client.patch(
+            self.url,
+            [{"id": first.pk, "title": "same"}, {"id": second.pk, "title": "SAME"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertEqual(Product.objects.get(pk=second.pk).title, "second")
+
+    def test_patch_keeps_titles_of_rows_that_are_not_retitled(self):
+        first = Product.objects.create(user=self.user, title="alpha")
+        second = Product.objects.create(user=self.user, title="beta")
+        response = self.client.patch(
+            self.url,
+            [{"id": first.pk, "title": "BETA"}, {"id": second.pk, "content": "x"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            response.data["errors"],
+            [{"index": 0, "errors": {"title": ["BETA is already exists as product name"]}}],
+        )
+        self.assertEqual(Product.objects.get(pk=first.pk).title, "alpha")
+        self.assertEqual(Product.objects.get(pk=second.pk).content, "x")
+
+    def test_patch_can_swap_case_of_its_own_title(self):
+        product = Product.objects.create(user=self.user, title="alpha")
+        response = self.client.patch(self.url, [{"id": product.pk, "title": "ALPHA"}], format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Product.objects.get(pk=product.pk).title, "ALPHA")
+
+    def test_titles_taken_by_a_concurrent_request(self):
+        # validate_items saw the titles free, another request wrote one since
+        Product.objects.create(user=self.user, title="Raced")
+        mine = Product.objects.create(user=self.user, title="mine")
+        with mock.patch("products.views.existing_titles", return_value=set()):
+            created = self.client.post(self.url, [{"title": "fine"}, {"title": "raced"}], format="json")
+            updated = self.client.patch(
+                self.url, [{"id": mine.pk, "title": "RACED"}, {"id": mine.pk, "price": "3.00"}], format="json"
+            )
+        self.assertEqual(created.status_code, 207)
+        self.assertEqual([item["title"] for item in created.data["results"]], ["fine"])
+        self.assertEqual(created.data["errors"][0]["index"], 1)
+        self.assertTrue(Product.objects.filter(title="fine").exists())
+        self.assertEqual(updated.status_code, 207)
+        self.assertEqual(updated.data["errors"][0]["index"], 0)
+        self.assertEqual(Product.objects.get(pk=mine.pk).title, "mine")
+
+    def test_malformed_ids(self):
+        product = Product.objects.create(user=self.user, title="mine")
+        response = self.client.patch(self.url, [{"id": [product.pk], "title": "x"}, {"id": "1"}], format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [0, 1])
+        response = self.client.delete(self.url, {"ids": ["abc", [1], True, product.pk]}, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["deleted"], [product.pk])
+        self.assertEqual(
+            [error["errors"]["id"] for error in response.data["errors"]],
+            [["A valid integer is required."]] * 3,
+        )
+
+    def test_delete(self):
+        products = [Product.objects.create(user=self.user, title=f"gone {i}") for i in range(3)]
+        ids = [product.pk for product in products]
+        response = self.client.delete(self.url, {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"deleted": ids, "errors": []})
+        self.assertFalse(Product.objects.filter(pk__in=ids).exists())
+
+    def test_delete_missing_and_foreign_ids(self):
+        mine = Product.objects.create(user=self.user, title="mine")
+        other = User.objects.create_user("other", password="pw")
+        theirs = Product.objects.create(user=other, title="theirs")
+        response = self.client.delete(self.url, {"ids": [mine.pk, theirs.pk, 999999]}, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["deleted"], [mine.pk])
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 2])
+        self.assertTrue(Product.objects.filter(pk=theirs.pk).exists())
+
+    def test_delete_requires_a_list(self):
+        response = self.client.delete(self.url, {"ids": 1}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TitleUniquenessTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("titles", "titles@example.com", "pw")
+        self.client.force_authenticate(self.user)
+        Product.objects.create(user=self.user, title="Camera")
+        Product.objects.create(user=self.user, title="Éclair")
+
+    def test_validate_title(self):
+        for title in ["camera", "CAMERA", "Éclair", "ÉCLAIR"]:
+            with self.subTest(title=title), self.assertRaises(serializers.ValidationError):
+                validate_title(title)
+        self.assertEqual(validate_title("camera bag"), "camera bag")
+
+    def test_keys_are_folded_by_the_database(self):
+        keys = title_keys(["Camera", "ÉCLAIR"])
+        self.assertEqual(keys["Camera"], "camera")
+        self.assertEqual(existing_titles(keys.values()), set(keys.values()))
+
+    def test_single_create(self):
+        response = self.client.post(
+            "/products/", {"title": "ÉCLAIR", "email": "e@example.com"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("title", response.data)
+
+    def test_bulk_create(self):
+        response = self.client.post(
+            "/products/bulk/",
+            [{"title": "Éclair"}, {"title": "CAMERA"}, {"title": "Crème"}, {"title": "CRèME"}],
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([error["index"] for error in response.data["errors"]], [0, 1, 3])
+        self.assertEqual([item["title"] for item in response.data["results"]], ["Crème"])
+
+    def test_bulk_patch(self):
+        product = Product.objects.create(user=self.user, title="plain")
+        response = self.client.patch(
+            "/products/bulk/", [{"id": product.pk, "title": "ÉCLAIR"}], format="json"
+        )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(Product.objects.get(pk=product.pk).title, "plain")
+
+
+class DedupeTitlesMigrationTests(TransactionTestCase):
+    """0007's data migration, run against rows the constraint would reject."""
+
+    constraint = Product._meta.constraints[0]
+
+    def setUp(self):
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(Product, self.constraint)
+        self.addCleanup(self.restore)
+
+    def restore(self):
+        Product.objects.all().delete()  # signals clear the FTS rows too
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Product, self.constraint)
+
+    def test_near_duplicates_are_renamed_before_the_constraint(self):
+        user = User.objects.create_user("dedupe", password="pw")
+        titles = ["Camera", "CAMERA", "Éclair", "ÉCLAIR", "camera bag"]
+        products = [Product.objects.create(user=user, title=title) for title in titles]
+        migration = importlib.import_module("products.migrations.0007_product_title_lower_uniq")
+        migration.dedupe_titles(apps, None)
+        renamed = {product.title for product in Product.objects.all()} - set(titles)
+        self.assertEqual(renamed, {f"CAMERA ({products[1].pk})", f"ÉCLAIR ({products[3].pk})"})
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Product, self.constraint)
+            editor.remove_constraint(Product, self.constraint)
+
+
+class ProductExportTests(APITestCase):
+    url = "/products/export/"
+
+    def setUp(self):
+        self.user = User.objects.create_superuser("export", "export@example.com", "pw")
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            Product.objects.create(user=self.user, title=f"item {i}", price=i)
+        other = User.objects.create_user("other", password="pw")
+        Product.objects.create(user=other, title="theirs")
+
+    def lines(self, response):
+        content = b"".join(response.streaming_content).decode()
+        self.assertTrue(content.endswith("\n"))
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_ndjson(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = self.lines(response)
+        self.assertEqual([row["title"] for row in rows], [f"item {i}" for i in range(5)])
+        self.assertEqual(
+            rows[1],
+            {
+                "id": rows[1]["id"],
+                "title": "item 1",
+                "content": None,
+                "price": "1.00",
+                "public": True,
+                "tags": compute_tags("item 1"),
+                "user_id": self.user.pk,
+                "owner": "export",
+            },
+        )
+
+    def test_only_the_users_products(self):
+        titles = [row["title"] for row in self.lines(self.client.get(self.url))]
+        self.assertNotIn("theirs", titles)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(User.objects.get(username="other"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_streams_in_chunks(self):
+        with mock.patch.object(ProductExportAPIView, "chunk_size", 2), mock.patch.object(
+            QuerySet, "iterator", autospec=True, side_effect=QuerySet.iterator
+        ) as iterator:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url)
+                # nothing is read until the body is consumed
+                self.assertEqual(len(queries), 0)
+                self.assertTrue(response.streaming)
+                chunks = list(response.streaming_content)
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 2, 1])
+        self.assertEqual(iterator.call_args.kwargs, {"chunk_size": 2})
+
+
+class UserCachedListTests(APITestCase):
+    url = "/products/?limit=50"
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_superuser("alice", "alice@example.com", "pw")
+        self.bob = User.objects.create_superuser("bob", "bob@example.com", "pw")
+        self.product = Product.objects.create(user=self.alice, title="camera")
+        Product.objects.create(user=self.bob, title="boat")
+
+    def titles(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [item["title"] for item in response.data["results"]]
+
+    def test_pages_are_cached_per_user(self):
+        self.assertEqual(self.titles(self.alice), ["camera"])
+        self.assertEqual(self.titles(self.bob), ["boat"])
+        # no signal: the cached page is still served
+        Product.objects.filter(pk=self.product.pk).update(title="renamed")
+        self.assertEqual(self.titles(self.alice), ["camera"])
+
+    def test_saves_and_deletes_invalidate_the_owner_only(self):
+        self.titles(self.alice)
+        self.titles(self.bob)
+        Product.objects.filter(user=self.bob).update(title="stale boat")
+        self.product.title = "new camera"
+        self.product.save()
+        self.assertEqual(self.titles(self.alice), ["new camera"])
+        self.assertEqual(self.titles(self.bob), ["boat"])
+        self.product.delete()
+        self.assertEqual(self.titles(self.alice), [])
+
+    def test_reassigned_product_leaves_the_previous_owners_list(self):
+        self.assertEqual(self.titles(self.alice), ["camera"])
+        self.assertEqual(self.titles(self.bob), ["boat"])
+        self.product.user = self.bob
+        self.product.save()
+        self.assertEqual(self.titles(self.alice), [])
+        self.assertEqual(self.titles(self.bob), ["camera", "boat"])
+
+    def test_version_survives_eviction(self):
+        self.titles(self.alice)
+        cache.delete(f"products:user:{self.alice.pk}:version")
+        Product.objects.filter(pk=self.product.pk).update(title="renamed")
+        self.assertEqual(self.titles(self.alice), ["renamed"])
+
+
+class ProductConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("etag", "etag@example.com", "pw")
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(user=self.user, title="camera", price=10)
+        Product.objects.create(user=self.user, title="boat", price=20)
+        self.detail_url = f"/products/{self.product.pk}/"
+
+    def touch(self, product):
+        # a later second than the Last-Modified already handed out
+        Product.objects.filter(pk=product.pk).update(updated_at=timezone.now() + timedelta(seconds=5))
+
+    def test_if_none_match(self):
+        for url in ["/products/", self.detail_url]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+                self.assertEqual(response["ETag"], etag)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='W/"other"').status_code, 200)
+
+    def test_if_modified_since(self):
+        for url in ["/products/", self.detail_url]:
+            with self.subTest(url=url):
+                last_modified = self.client.get(url)["Last-Modified"]
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["Last-Modified"], last_modified)
+
+    def test_changes_invalidate(self):
+        list_etag = self.client.get("/products/")["ETag"]
+        detail = self.client.get(self.detail_url)
+        self.touch(self.product)
+        self.assertEqual(self.client.get("/products/", HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail["ETag"]).status_code, 200)
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=detail["Last-Modified"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_changes_with_owners_other_products(self):
+        # the detail page embeds related_products
+        etag = self.client.get(self.detail_url)["ETag"]
+        Product.objects.create(user=self.user, title="new car")
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_query_string_is_part_of_the_etag(self):
+        etag = self.client.get("/products/?limit=1")["ETag"]
+        self.assertNotEqual(self.client.get("/products/?limit=2")["ETag"], etag)
+        self.assertEqual(self.client.get("/products/?limit=2", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_bulk_patch_invalidates(self):
+        etag = self.client.get("/products/")["ETag"]
+        response = self.client.patch("/products/bulk/", [{"id": self.product.pk, "price": "11.00"}], format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/products/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        # the router views aren't scoped to the owner: same rows for both users
+        other = User.objects.create_superuser("etag2", "etag2@example.com", "pw")
+        urls = ["/api_routers/product-abc/", f"/api_routers/product-abc/{self.product.pk}/"]
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+        self.client.force_authenticate(other)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etags[url])
+
+    def test_vary_on_credentials(self):
+        for url in ["/products/", self.detail_url, "/products/?paginate=cursor&limit=1"]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(response.status_code, 304)
+                vary = [header.strip() for header in response["Vary"].split(",")]
+                self.assertIn("Authorization", vary)
+                self.assertIn("Cookie", vary)
+
+
+class ProductCursorPaginationTests(APITestCase):
+    url = "/products/?paginate=cursor&limit=3"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser("cursor", "cursor@example.com", "pw")
+        self.client.force_authenticate(self.user)
+        # mostly the same price: ties are the case OFFSET used to paper over
+        prices = [5, 5, 1, 5, 9, 5, 1, 5]
+        self.products = [
+            Product.objects.create(user=self.user, title=f"item {i}", price=price)
+            for i, price in enumerate(prices)
+        ]
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([item["id"] for item in response.data["results"]])
+            url = response.data[link]
+        return pages
+
+    def walk_both_ways(self, url):
+        forward = self.walk(url, "next")
+        last_page = self.client.get(url)
+        while last_page.data["next"]:
+            last_page = self.client.get(last_page.data["next"])
+        backward = self.walk(last_page.data["previous"], "previous")
+        return forward, backward
+
+    def test_id_cursor(self):
+        ids = [product.pk for product in self.products]
+        forward, backward = self.walk_both_ways(self.url)
+        self.assertEqual(forward, [ids[0:3], ids[3:6], ids[6:8]])
+        self.assertEqual(backward, [ids[3:6], ids[0:3]])
+
+    def test_price_cursor_with_duplicate_prices(self):
+        ordered = [p.pk for p in sorted(self.products, key=lambda p: (p.price, p.pk))]
+        forward, backward = self.walk_both_ways(self.url + "&order=price")
+        self.assertEqual(forward, [ordered[0:3], ordered[3:6], ordered[6:8]])
+        self.assertEqual(backward, [ordered[3:6], ordered[0:3]])
+
+    def test_bad_cursor(self):
+        response = self.client.get("/products/?cursor=bm9wZQ&order=price")
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_pages_do_not_count(self):
+        for url in [self.url, self.url + "&order=price"]:
+            with self.subTest(url=url):
+                cache.clear()
+                next_url = self.client.get(url).data["next"]
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(next_url)
+                self.assertEqual(response.status_code, 200)
+                sql = " ".join(query["sql"] for query in queries).upper()
+                self.assertNotIn("COUNT(", sql)
+                self.assertNotIn("OFFSET", sql)
+        # limit/offset pages still count, they report it
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/products/?limit=3&offset=3")
+        self.assertIn("COUNT(", " ".join(query["sql"] for query in queries).upper())
+
+    def test_cursor_page_etag(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        first = Product.objects.get(pk=response.data["results"][0]["id"])
+        first.price = 7
+        first.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProductQueryCountTests(APITestCase):
+    """
+    Query counts from the profiling middleware (response.profile): a
+    page costs the same number of queries whatever it holds, so an N+1
+    in a serializer shows up here.
+    """
+
+    list_urls = ["/products/?limit=50", "/api_routers/product-abc/?limit=50"]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser("queries", "queries@example.com", "pw")
+        self.client.force_authenticate(self.user)
+        self.product = Product.objects.create(user=self.user, title="product 0")
+
+    def add_products(self, count):
+        other = User.objects.create_user(f"owner{Product.objects.count()}", password="pw")
+        for i in range(count):
+            Product.objects.create(user=self.user if i % 2 else other, title=f"product {Product.objects.count()}")
+
+    def queries(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.profile.queries
+
+    def test_list(self):
+        for url in self.list_urls:
+            with self.subTest(url=url):
+                self.add_products(2)
+                few = self.queries(url)
+                self.add_products(10)
+                self.assertEqual(self.queries(url), few)
+                self.assertLessEqual(few, 4)
+
+    def test_detail(self):
+        for url in [f"/products/{self.product.pk}/", f"/api_routers/product-abc/{self.product.pk}/"]:
+            with self.subTest(url=url):
+                few = self.queries(url)
+                self.add_products(10)
+                self.assertEqual(self.queries(url), few)
+                self.assertLessEqual(few, 5)
+
+    def test_server_timing_header(self):
+        response = self.client.get(self.list_urls[0])
+        self.assertIn(f'desc="{response.profile.queries} queries"', response["Server-Timing"])
+
+
+@skipUnless(connection.vendor == "sqlite", "FTS5 table from migration 0005")
+class SQLiteFTSSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("search", password="pw")
+        self.titled = Product.objects.create(user=self.user, title="vintage camera", content="boxed")
+        self.mentioned = Product.objects.create(
+            user=self.user, title="leather strap", content="fits any camera and most bags"
+        )
+        Product.objects.create(user=self.user, title="speed boat", content="fast")
+
+    def search(self, query, **kwargs):
+        return list(Product.objects.search(query, **kwargs).values_list("title", flat=True))
+
+    def fts_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid, title FROM {FTS_TABLE} ORDER BY rowid")
+            return cursor.fetchall()
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search("camera"), ["vintage camera", "leather strap"])
+
+    def test_prefix_and_every_term(self):
+        self.assertEqual(self.search("cam"), ["vintage camera", "leather strap"])
+        self.assertEqual(self.search("camera bags"), ["leather strap"])
+        self.assertEqual(self.search("plane"), [])
+
+    def test_query_syntax_is_quoted(self):
+        self.assertEqual(self.search('camera OR "boat'), [])
+        self.assertEqual(self.search('camera" *'), ["vintage camera", "leather strap"])
+        self.assertEqual(self.search("  "), [])
+
+    def test_private_and_user_filters(self):
+        Product.objects.filter(pk=self.titled.pk).update(public=False)
+        self.assertEqual(self.search("camera"), ["leather strap"])
+        other = User.objects.create_user("other", password="pw")
+        self.assertEqual(self.search("camera", user=other), [])
+
+    def test_one_match_per_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search("camera")
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0]["sql"].count("MATCH"), 1)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.titled.title = "vintage lens"
+        self.titled.save()
+        self.assertEqual(self.search("camera"), ["leather strap"])
+        self.assertEqual(self.search("lens"), ["vintage lens"])
+        self.mentioned.delete()
+        self.assertEqual(self.search("camera"), [])
+        self.assertNotIn(self.mentioned.pk, [pk for pk, _ in self.fts_rows()])
+
+    def test_bulk_writes_are_indexed(self):
+        staff = User.objects.create_superuser("staff", "staff@example.com", "pw")
+        api = APIClient()
+        api.force_authenticate(staff)
+        api.post("/products/bulk/", [{"title": "camera tripod"}], format="json")
+        self.assertIn("camera tripod", self.search("tripod"))
+        pk = Product.objects.get(title="camera tripod").pk
+        api.patch("/products/bulk/", [{"id": pk, "title": "lens tripod"}], format="json")
+        self.assertEqual(self.search("lens"), ["lens tripod"])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        get_search_backend().rebuild(Product.objects.all())
+        self.assertEqual(len(self.fts_rows()), 3)
+        self.assertEqual(self.search("camera"), ["vintage camera", "leather strap"])
+
+
+@override_settings(PRODUCT_SEARCH_BACKEND="products.search_backends.IContainsSearchBackend")
+class IContainsSearchTests(TestCase):
+    def test_fallback_backend(self):
+        self.assertIsInstance(get_search_backend(), IContainsSearchBackend)
+        user = User.objects.create_user("search", password="pw")
+        Product.objects.create(user=user, title="Vintage Camera")
+        Product.objects.create(user=user, title="strap", content="for a CAMERA")
+        Product.objects.create(user=user, title="boat")
+        titles = Product.objects.search("camera").values_list("title", flat=True)
+        self.assertEqual(sorted(titles), ["Vintage Camera", "strap"])
+        # substring match, not a word prefix
+        self.assertEqual(Product.objects.search("amer").count(), 2)
+
+
+class ComputeTagsTests(TestCase):
+    def test_tags_from_words(self):
+        self.assertEqual(compute_tags("Camera and boats"), ["cameras", "boats"])
+        self.assertEqual(compute_tags("sofa", "for movie nights"), ["movies"])
+        # whole words only
+        self.assertEqual(compute_tags("carpet", "cartoon"), compute_tags("carpet"))
+
+    def test_fallback_is_a_stable_hash_of_the_title(self):
+        # crc32, not hash(): the same in every process
+        self.assertEqual(compute_tags("zebra"), ["boats"])
+        self.assertEqual(compute_tags("ZEBRA", "other content"), ["boats"])
+        self.assertEqual(compute_tags("plain sofa"), ["cameras"])
+        self.assertEqual(compute_tags(None), ["electronics"])
+
+    def test_migration_copy_matches(self):
+        migration = importlib.import_module("products.migrations.0006_product_tags_index_hash")
+        for title, content in [("zebra", None), ("Camera and boats", "x"), ("", ""), ("sofa", "movie")]:
+            self.assertEqual(migration.compute_tags(title, content), compute_tags(title, content))
+
+    def test_save_stores_tags(self):
+        user = User.objects.create_user("tags", password="pw")
+        product = Product.objects.create(user=user, title="zebra")
+        product.title = "red car"
+        product.save(update_fields=["title"])
+        self.assertEqual(Product.objects.get(pk=product.pk).tags, ["cars"])
+
+
+class RecordingIndex:
+    """Stands in for the Algolia index, keeps a copy of every batch."""
+
+    def __init__(self):
+        self.saved = []
+        self.deleted = []
+
+    def save_objects(self, records):
+        self.saved.append(list(records))
+
+    def delete_objects(self, object_ids):
+        self.deleted.append(list(object_ids))
+
+    def saved_titles(self):
+        return [record["title"] for batch in self.saved for record in batch]
+
+
+class IndexHashTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("hash", password="pw")
+        self.adapter = algolia_engine.get_adapter(Product)
+        self.index = RecordingIndex()
+        patcher = mock.patch(
+            "products.management.commands.reindex_products.get_index", return_value=self.index
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reindex(self, *args):
+        out = StringIO()
+        call_command("reindex_products", *args, stdout=out)
+        return out.getvalue()
+
+    def test_get_changes_skips_unchanged_records(self):
+        product = Product.objects.create(user=self.user, title="camera")
+        record, first_hash = self.adapter.get_changes(product)
+        self.assertEqual(record["title"], "camera")
+        product.index_hash = first_hash
+        self.assertEqual(self.adapter.get_changes(product), (None, first_hash))
+        product.price = 99
+        record, new_hash = self.adapter.get_changes(product)
+        self.assertIsNotNone(record)
+        self.assertNotEqual(new_hash, first_hash)
+
+    def test_reindex_pushes_only_changed_products(self):
+        camera = Product.objects.create(user=self.user, title="camera")
+        Product.objects.create(user=self.user, title="boat")
+        self.assertIn("2 products pushed, 0 unchanged", self.reindex())
+        self.assertEqual(self.index.saved_titles(), ["camera", "boat"])
+        self.assertNotIn("", Product.objects.values_list("index_hash", flat=True))
+
+        self.index.saved.clear()
+        self.assertIn("0 products pushed, 2 unchanged", self.reindex())
+        self.assertEqual(self.index.saved, [])
+
+        camera.content = "new content"
+        camera.save()
+        self.assertIn("1 products pushed, 1 unchanged", self.reindex())
+        self.assertEqual(self.index.saved_titles(), ["camera"])
+
+    def test_reindex_removes_products_that_stopped_being_public(self):
+        camera = Product.objects.create(user=self.user, title="camera")
+        self.reindex()
+        Product.objects.filter(pk=camera.pk).update(public=False)
+        self.assertIn("1 products pushed", self.reindex())
+        self.assertEqual(self.index.deleted, [[camera.pk]])
+        self.assertEqual(Product.objects.get(pk=camera.pk).index_hash, "")
+        self.reindex()
+        self.assertEqual(self.index.deleted, [[camera.pk]])
+
+    def test_batches(self):
+        for i in range(5):
+            Product.objects.create(user=self.user, title=f"item {i}")
+        self.reindex("--batch-size", "2")
+        self.assertEqual([len(batch) for batch in self.index.saved], [2, 2, 1])
+
+    def test_dry_run_writes_nothing(self):
+        Product.objects.create(user=self.user, title="camera")
+        self.assertIn("[dry run] 1 products pushed", self.reindex("--dry-run"))
+        self.assertEqual(self.index.saved, [])
+        self.assertEqual(Product.objects.get().index_hash, "")
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("pricing", password="pw")
+        for price in ["10.00", "19.99", "0.01", "123456.78", "0.00"]:
+            Product.objects.create(user=user, title=f"price {price}", price=Decimal(price))
+
+    def test_annotated_prices_match_the_properties(self):
+        annotated = {product.pk: product for product in Product.objects.with_pricing()}
+        for product in Product.objects.all():
+            with self.subTest(price=product.price):
+                self.assertNotIn("_sale_price", product.__dict__)
+                row = annotated[product.pk]
+                self.assertIn("_sale_price", row.__dict__)
+                self.assertEqual(row.sale_price, product.sale_price)
+                self.assertEqual(row.get_discount(), product.get_discount())
+                self.assertEqual(row.sale_price.as_tuple().exponent, -2)
+                self.assertEqual(row.get_discount().as_tuple().exponent, -2)
+
+    def test_values(self):
+        product = Product.objects.with_pricing().get(title="price 19.99")
+        self.assertEqual(product.sale_price, Decimal("15.99"))
+        self.assertEqual(product.get_discount(), Decimal("4.00"))
+        product = Product.objects.get(title="price 19.99")
+        self.assertEqual(product.sale_price, Decimal("15.99"))
+        self.assertEqual(product.get_discount(), Decimal("4.00"))
+
+    def test_setter(self):
+        product = Product.objects.get(title="price 10.00")
+        product.sale_price = Decimal("7.123")
+        self.assertEqual(product.sale_price, Decimal("7.12"))
+
+    def test_save_drops_the_annotated_values(self):
+        product = Product.objects.with_pricing().get(title="price 10.00")
+        self.assertEqual(product.sale_price, Decimal("8.00"))
+        product.price = Decimal("20.00")
+        product.save()
+        self.assertEqual(product.sale_price, Decimal("16.00"))
+        self.assertEqual(product.get_discount(), Decimal("4.00"))
+
+    def test_list_serializes_the_annotated_values(self):
+        user = User.objects.get(username="pricing")
+        user.is_staff = user.is_superuser = True
+        user.save()
+        client = APIClient()
+        client.force_authenticate(user)
+        rows = client.get("/products/?limit=50").data["results"]
+        by_title = {row["title"]: row for row in rows}
+        self.assertEqual(by_title["price 19.99"]["sale_price"], "15.99")
+        self.assertEqual(by_title["price 19.99"]["my_discount"], Decimal("4.00"))
+
+
+class FastListSerializerTests(APITestCase):
+    url = "/api_routers/product-abc/?limit=50"
+
+    def setUp(self):
+        self.user = User.objects.create_superuser("fast", "fast@example.com", "pw")
+        self.client.force_authenticate(self.user)
+        other = User.objects.create_user("other", password="pw")
+        Product.objects.create(user=self.user, title="camera", content="with lens", price=Decimal("19.99"))
+        Product.objects.create(user=self.user, title="no content", content=None, price=Decimal("0.01"))
+        Product.objects.create(user=other, title="boat", price=Decimal("123456.78"))
+        Product.objects.create(user=None, title="orphan", price=0)
+
+    def compare(self, view_class, url, **extra):
+        serialize = ProductFastListSerializer.serialize
+        with mock.patch.object(
+            ProductFastListSerializer, "serialize", autospec=True, side_effect=serialize
+        ) as fast_path:
+            fast = self.client.get(url, **extra)
+        fast_path.assert_called_once()
+        with mock.patch.object(view_class, "fast_list_serializer_class", None):
+            slow = self.client.get(url, **extra)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_identical_to_product_serializer(self):
+        response = self.compare(ProductViewSet, self.url)
+        rows = {row["title"]: row for row in response.json()["results"]}
+        self.assertEqual(set(rows), {"camera", "no content", "boat", "orphan"})
+        self.assertIsNone(rows["no content"]["content"])
+        self.assertIsNone(rows["orphan"]["owner"])
+        self.assertNotIn("related_products", rows["orphan"])
+        self.assertEqual(rows["camera"]["price"], "19.99")
+        self.assertEqual(rows["camera"]["url"], f"http://testserver/products/{rows['camera']['id']}/")
+
+    def test_identical_on_later_pages(self):
+        response = self.compare(ProductViewSet, "/api_routers/product-abc/?limit=2&offset=1")
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "example.com"])
+    def test_identical_hyperlinks_on_another_host(self):
+        response = self.compare(ProductViewSet, self.url, HTTP_HOST="example.com")
+        for row in response.json()["results"]:
+            self.assertTrue(row["url"].startswith("http://example.com/products/"))
+            self.assertTrue(row["edit_url"].startswith("http://example.com/products/"))
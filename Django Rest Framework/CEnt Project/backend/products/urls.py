@@ -3,6 +3,8 @@ from .views import *
 
 urlpatterns = [
     path("", ProductListCreateAPIView.as_view(), name="product-list"),
+    path("bulk/", ProductBulkAPIView.as_view(), name="product-bulk"),
+    path("export/", ProductExportAPIView.as_view(), name="product-export"),
     # path("<int:pk>/", product_alt_view),
     path("<int:pk>/", ProductMixinView.as_view(), name="product-detail"),
     path("<int:pk>/update/", ProductUpdateAPIView.as_view(), name="product-edit"),
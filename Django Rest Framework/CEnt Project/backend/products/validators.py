@@ -1,19 +1,59 @@
 from rest_framework import serializers
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Lower
 from .models import Product
-from rest_framework.validators import UniqueValidator
 
 
 def validate_title(value):
-    qs = Product.objects.filter(title__iexact=value)
+    # LOWER(title) = LOWER(value) probes the products_product_title_lower_uniq
+    # index, title__iexact can't use it (UPPER/LIKE comparison). Both sides
+    # are folded by the database, like the constraint: SQLite's LOWER() only
+    # folds ASCII, Python's str.lower() folds everything.
+    qs = Product.objects.annotate(title_lower=Lower("title")).filter(
+        title_lower=Lower(Value(value))
+    )
     if qs.exists():
         raise serializers.ValidationError(f"{value} is already exists as product name")
     return value
 
 
+def title_keys(titles, chunk_size=500):
+    """
+    {title: LOWER(title)} computed by the database, i.e. the value the
+    unique constraint compares. One query per `chunk_size` titles.
+    """
+    titles = list(dict.fromkeys(titles))
+    keys = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(titles), chunk_size):
+            chunk = titles[start : start + chunk_size]
+            cursor.execute("SELECT " + ", ".join(["LOWER(%s)"] * len(chunk)), chunk)
+            keys.update(zip(chunk, cursor.fetchone()))
+    return keys
+
+
+def existing_titles(keys, exclude_pks=()):
+    """
+    The keys (see title_keys) that are already taken, in one IN query
+    (the batch version of validate_title).
+    """
+    keys = set(keys)
+    if not keys:
+        return set()
+    qs = (
+        Product.objects.annotate(title_lower=Lower("title"))
+        .filter(title_lower__in=keys)
+        .exclude(pk__in=exclude_pks)
+    )
+    return set(qs.values_list("title_lower", flat=True))
+
+
 def title_no_hello(value):
     if "hello world" in value.lower():
-        raise serializers.ValidationError("password":"Hellow is not allowed")
+        raise serializers.ValidationError("Hellow is not allowed")
     return value
 
 
-unique_product_title = UniqueValidator(queryset=Product.objects.all(), lookup="iexact")
+# UniqueValidator(lookup="iexact") would scan the table, the index backed check is validate_title
+unique_product_title = validate_title
@@ -1,5 +1,9 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import generics, mixins, permissions, authentication
+from rest_framework import generics, mixins, permissions, authentication, status
 from .models import *
 from .serializers import *
 from rest_framework.response import Response
@@ -8,19 +12,32 @@ from django.shortcuts import get_object_or_404
 from api.permission import *
 from api.authentication import *
 from api.mixins import *
+from api.cache import bump_user_version
+from api.pagination import OptInCursorPagination
+from search import outbox
+from .search_backends import get_search_backend
 
 
 # & GENERIC API VIEW
-class ProductDetailAPIView(generics.RetrieveAPIView):
+class ProductDetailAPIView(ConditionalGetMixin, generics.RetrieveAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    object_scope_field = "user_id"  # related_products
 
 
 class ProductListCreateAPIView(
-    UserQuerySetMixin, StaffEditorPermissionMixin, generics.ListCreateAPIView
+    ConditionalGetMixin,
+    UserCachedListMixin,
+    UserQuerySetMixin,
+    StaffEditorPermissionMixin,
+    generics.ListCreateAPIView,
 ):
-    queryset = Product.objects.all()
+    # owner / related_products read user.product_set for every row
+    queryset = (
+        Product.objects.with_pricing().select_related("user").prefetch_related("user__product_set")
+    )
     serializer_class = ProductSerializer
+    pagination_class = OptInCursorPagination
 
     # permission_classes = [IsStaffEditorPermission]
 
@@ -39,16 +56,17 @@ class ProductListCreateAPIView(
     #     return qs.filter(user=user)
 
 
-class ProductListAPIView(generics.ListAPIView):
-    queryset = Product.objects.all()
+class ProductListAPIView(ConditionalGetMixin, FastListMixin, generics.ListAPIView):
+    queryset = Product.objects.with_pricing()
     serializer_class = ProductSerializer
+    fast_list_serializer_class = ProductFastListSerializer
 
 
 class ProductUpdateAPIView(UserQuerySetMixin, generics.UpdateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     lookup_field = "pk"
-    permission_classes = [permissions.DjangoModelPermissions]
+    permission_classes = [CachedDjangoModelPermissions]
 
     def perform_update(self, serializer):
         instance = serializer.save()
@@ -67,6 +85,208 @@ class ProductDeleteAPIView(UserQuerySetMixin, generics.DestroyAPIView):
         super().perform_destroy(instance)
 
 
+# & BULK CREATE / UPDATE / DELETE
+class ProductBulkAPIView(
+    UserQuerySetMixin, StaffEditorPermissionMixin, generics.GenericAPIView
+):
+    """
+    POST   [{title, content, price, public}, ...]      -> bulk_create
+    PATCH  [{id, title?, content?, price?, public?}, ...] -> bulk_update
+    DELETE {"ids": [...]}                              -> one delete query
+    Valid items are written in one transaction, invalid ones come back
+    as {"index": i, "errors": {...}} with a 207 status.
+    """
+
+    queryset = Product.objects.all()
+    serializer_class = ProductBulkItemSerializer
+    batch_size = 500
+    update_fields = ["title", "content", "price", "public"]
+
+    def validate_items(self, items, partial=False, instances=None):
+        if not isinstance(items, list):
+            raise serializers.ValidationError("Expected a list of products.")
+        valid, errors = [], []
+        for i, item in enumerate(items):
+            instance = None
+            if instances is not None:
+                pk = item.get("id") if isinstance(item, dict) else None
+                instance = instances.get(pk) if isinstance(pk, int) else None
+                if instance is None:
+                    errors.append({"index": i, "errors": {"id": ["Product not found."]}})
+                    continue
+            serializer = self.get_serializer(instance, data=item, partial=partial)
+            if serializer.is_valid():
+                valid.append((i, instance, serializer.validated_data))
+            else:
+                errors.append({"index": i, "errors": serializer.errors})
+
+        # title uniqueness: one IN query for the batch + duplicates inside it,
+        # compared as the database folds case (title_keys). Only the rows
+        # being retitled give up their current title, the other rows of the
+        # batch keep theirs.
+        retitled = {instance.pk for _, instance, data in valid if instance is not None and "title" in data}
+        titles = [data["title"] for _, _, data in valid if "title" in data]
+        keys, taken, seen = {}, set(), set()
+        if titles:
+            kept = [
+                instance.title
+                for _, instance, _ in valid
+                if instance is not None and instance.pk not in retitled
+            ]
+            keys = title_keys(titles + kept)
+            taken = existing_titles([keys[title] for title in titles], exclude_pks=retitled)
+            seen = {keys[title] for title in kept}
+        checked = []
+        for i, instance, data in valid:
+            title = data.get("title")
+            if title is not None:
+                key = keys[title]
+                if key in taken or key in seen:
+                    errors.append({"index": i, "errors": self.title_taken(title)})
+                    continue
+                seen.add(key)
+            checked.append((i, instance, data))
+        errors.sort(key=lambda error: error["index"])
+        return checked, errors
+
+    def title_taken(self, title):
+        return {"title": [f"{title} is already exists as product name"]}
+
+    def bulk_write(self, items, write, created=False):
+        """
+        write(products) and the index sync in one transaction. If another
+        request took one of the titles since validate_items, the batch is
+        retried one product per savepoint so only the conflicting items
+        are reported. Returns (written products, errors).
+        """
+        products = [product for _, product in items]
+        try:
+            with transaction.atomic():
+                written = write(products)
+                self.after_bulk_write(written)
+            return written, []
+        except IntegrityError:
+            pass
+        written, errors = [], []
+        with transaction.atomic():
+            for i, product in items:
+                if created:
+                    # pk may be set by a batch that was rolled back
+                    product.pk = None
+                    product._state.adding = True
+                try:
+                    with transaction.atomic():
+                        written += write([product])
+                except IntegrityError:
+                    errors.append({"index": i, "errors": self.title_taken(product.title)})
+            if written:
+                self.after_bulk_write(written)
+        return written, errors
+
+    def after_bulk_write(self, products):
+        # bulk_create / bulk_update skip post_save, keep the search indexes in sync
+        get_search_backend().index_products(products)
+        outbox.enqueue([product.pk for product in products])
+        bump_user_version(self.request.user.pk)
+
+    def bulk_response(self, products, errors, created=False):
+        data = {
+            "results": ProductBulkItemSerializer(products, many=True).data,
+            "errors": errors,
+        }
+        if errors:
+            return Response(data, status=status.HTTP_207_MULTI_STATUS)
+        return Response(data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        checked, errors = self.validate_items(request.data)
+        items = []
+        for i, _, data in checked:
+            data.pop("id", None)
+            product = Product(user=request.user, **data)
+            product.content = product.content or product.title
+            product.tags = compute_tags(product.title, product.content)
+            items.append((i, product))
+        products, conflicts = self.bulk_write(
+            items,
+            lambda products: Product.objects.bulk_create(products, batch_size=self.batch_size),
+            created=True,
+        )
+        errors = sorted(errors + conflicts, key=lambda error: error["index"])
+        return self.bulk_response(products, errors, created=True)
+
+    def patch(self, request, *args, **kwargs):
+        items = request.data if isinstance(request.data, list) else []
+        ids = [item.get("id") for item in items if isinstance(item, dict)]
+        instances = self.get_queryset().in_bulk([pk for pk in ids if isinstance(pk, int)])
+        checked, errors = self.validate_items(request.data, partial=True, instances=instances)
+        items = []
+        now = timezone.now()
+        for i, instance, data in checked:
+            data.pop("id", None)
+            for field, value in data.items():
+                setattr(instance, field, value)
+            instance.content = instance.content or instance.title
+            instance.tags = compute_tags(instance.title, instance.content)
+            instance.updated_at = now  # bulk_update skips auto_now
+            items.append((i, instance))
+
+        def write(products):
+            Product.objects.bulk_update(
+                products, self.update_fields + ["tags", "updated_at"], batch_size=self.batch_size
+            )
+            return products
+
+        products, conflicts = self.bulk_write(items, write)
+        errors = sorted(errors + conflicts, key=lambda error: error["index"])
+        return self.bulk_response(products, errors)
+
+    def delete(self, request, *args, **kwargs):
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list):
+            raise serializers.ValidationError({"ids": ["Expected a list of ids."]})
+        is_id = lambda pk: isinstance(pk, int) and not isinstance(pk, bool)
+        qs = self.get_queryset().filter(pk__in=[pk for pk in ids if is_id(pk)])
+        with transaction.atomic():
+            found = set(qs.values_list("pk", flat=True))
+            qs.delete()
+        errors = []
+        for i, pk in enumerate(ids):
+            if not is_id(pk):
+                errors.append({"index": i, "errors": {"id": ["A valid integer is required."]}})
+            elif pk not in found:
+                errors.append({"index": i, "errors": {"id": ["Product not found."]}})
+        data = {"deleted": sorted(found), "errors": errors}
+        if errors:
+            return Response(data, status=status.HTTP_207_MULTI_STATUS)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+# & STREAMING EXPORT (NDJSON, one product per line)
+class ProductExportAPIView(UserQuerySetMixin, StaffEditorPermissionMixin, generics.GenericAPIView):
+    queryset = Product.objects.all()
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        chunk_size = self.chunk_size
+        rows = ProductExportSerializer(self.get_queryset()).rows(chunk_size=chunk_size)
+        return StreamingHttpResponse(
+            self.stream(rows, chunk_size), content_type="application/x-ndjson"
+        )
+
+    def stream(self, rows, chunk_size):
+        # one write per chunk instead of per row, memory stays O(chunk_size)
+        encode = DjangoJSONEncoder(separators=(",", ":")).encode
+        lines = []
+        for row in rows:
+            lines.append(encode(row))
+            if len(lines) >= chunk_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+
 # & Using FUNCTION BASED VIEWS for Create Retrieve or List
 
 
@@ -95,15 +315,17 @@ def product_alt_view(request, pk=None, *args, **kwargs):
 
 # & MIXINS AND GENERIC API VIEW
 class ProductMixinView(
+    ConditionalGetMixin,
     UserQuerySetMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     generics.GenericAPIView,
 ):
-    queryset = Product.objects.all()
+    queryset = Product.objects.with_pricing()
     serializer_class = ProductSerializer
     permission_classes = [IsStaffEditorPermission]
+    object_scope_field = "user_id"
 
     def get(self, request, *args, **kwargs):
         pk = kwargs.get("pk")
@@ -1,10 +1,13 @@
 from rest_framework import viewsets
 
+from api.mixins import ConditionalGetMixin, FastListMixin
 from .models import *
 from .serializers import *
 
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.with_pricing()
     serializer_class = ProductSerializer
+    fast_list_serializer_class = ProductFastListSerializer
     lookup_field = "pk"
+    object_scope_field = "user_id"
@@ -1,22 +1,36 @@
+from functools import lru_cache
+
+from algoliasearch.exceptions import AlgoliaException
 from algoliasearch_django import algolia_engine
+from django.conf import settings
+
+from .local_index import get_local_index
 
 
 def get_client():
     return algolia_engine.client
 
 
+@lru_cache(maxsize=None)
 def get_index(index_name="root_Product"):
+    # init_index only builds a client side object, no need to redo it per request
     client = get_client()
     index = client.init_index(index_name)
     return index
 
 
 def perform_search(query, **kwargs):
-    index = get_index()
     params = {}
     tags = ""
     if "tags" in kwargs:
         tags = kwargs.pop("tags") or []
         params["tagFilters"] = tags
-    results = index.search(query, params)
+    if settings.SEARCH_ENGINE == "local":
+        return get_local_index().search(query, params)
+    try:
+        index = get_index()
+        results = index.search(query, params)
+    except AlgoliaException:
+        # algolia unreachable -> answer from the in-process index
+        results = get_local_index().search(query, params)
     return results
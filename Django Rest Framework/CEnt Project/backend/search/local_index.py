@@ -0,0 +1,252 @@
+import bisect
+import json
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from algoliasearch_django import algolia_engine
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+
+from products.models import Product
+from products.search_backends import tokenize
+
+# & fields of the record that are full text searchable, with their weight
+SEARCHABLE_FIELDS = {"title": 2, "content": 1}
+
+
+class LocalSearchIndex:
+    """
+    In-process inverted index that answers the same queries as the
+    Algolia index registered in products/index.py.
+
+    Records are built with the registered ProductIndex adapter, so they
+    hold exactly ProductIndex.fields plus `objectID` and `_tags`.
+
+    `stamp` is the products table's [count, max(updated_at)] the records
+    were built from. refresh() compares it with the database and
+    re-indexes what other processes (or a restart) changed.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.records = {}  # objectID -> record
+        self.postings = defaultdict(dict)  # token -> {objectID: weight}
+        self.tags = defaultdict(set)  # tag -> {objectID}
+        self.sorted_tokens = []
+        self.stamp = None
+        self.checked_at = 0
+        self.lock = threading.RLock()
+
+    # & writing
+    def add_record(self, record):
+        with self.lock:
+            object_id = str(record["objectID"])
+            self.remove_record(object_id)
+            self.records[object_id] = record
+            for field, weight in SEARCHABLE_FIELDS.items():
+                for token in tokenize(str(record.get(field) or "")):
+                    token = token.lower()
+                    if token not in self.postings:
+                        bisect.insort(self.sorted_tokens, token)
+                    postings = self.postings[token]
+                    postings[object_id] = postings.get(object_id, 0) + weight
+            for tag in record.get("_tags") or []:
+                self.tags[tag].add(object_id)
+
+    def remove_record(self, object_id):
+        with self.lock:
+            object_id = str(object_id)
+            record = self.records.pop(object_id, None)
+            if record is None:
+                return
+            for field in SEARCHABLE_FIELDS:
+                for token in tokenize(str(record.get(field) or "")):
+                    token = token.lower()
+                    postings = self.postings.get(token)
+                    if postings is None:
+                        continue
+                    postings.pop(object_id, None)
+                    if not postings:
+                        del self.postings[token]
+                        i = bisect.bisect_left(self.sorted_tokens, token)
+                        if i < len(self.sorted_tokens) and self.sorted_tokens[i] == token:
+                            del self.sorted_tokens[i]
+            for tag in record.get("_tags") or []:
+                self.tags[tag].discard(object_id)
+
+    def index_product(self, product):
+        adapter = algolia_engine.get_adapter(Product)
+        if adapter._should_index(product):
+            self.add_record(adapter.get_raw_record(product))
+        else:
+            self.remove_record(product.pk)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+            self.postings.clear()
+            self.tags.clear()
+            self.sorted_tokens = []
+            self.stamp = None
+
+    def build(self, queryset=None):
+        queryset = Product.objects.select_related("user") if queryset is None else queryset
+        with self.lock:
+            self.clear()
+            # taken first, rows written while building are picked up by refresh()
+            stamp = db_stamp()
+            for product in queryset.iterator():
+                self.index_product(product)
+            self.stamp = stamp
+            self.checked_at = time.monotonic()
+
+    # & reconciling with the database
+    def refresh(self):
+        """
+        Bring the records up to date with the products table: re-index
+        the rows updated since the stamp and drop the deleted ones.
+        Returns True if anything had to be done.
+        """
+        with self.lock:
+            self.checked_at = time.monotonic()
+            stamp = db_stamp()
+            if stamp == self.stamp:
+                return False
+            if self.stamp is None or self.stamp[1] is None:
+                self.build()
+                return True
+            changed = Product.objects.select_related("user").filter(
+                updated_at__gte=self.stamp[1]
+            )
+            for product in changed.iterator():
+                self.index_product(product)
+            existing = {str(pk) for pk in Product.objects.values_list("pk", flat=True)}
+            for object_id in [object_id for object_id in self.records if object_id not in existing]:
+                self.remove_record(object_id)
+            self.stamp = stamp
+            return True
+
+    def refresh_if_due(self, interval):
+        if time.monotonic() - self.checked_at >= interval:
+            self.refresh()
+
+    # & reading
+    def prefix_matches(self, term):
+        """
+        {objectID: score} for every indexed token starting with `term`.
+        An exact token match scores higher than a prefix match.
+        """
+        scores = {}
+        i = bisect.bisect_left(self.sorted_tokens, term)
+        while i < len(self.sorted_tokens) and self.sorted_tokens[i].startswith(term):
+            token = self.sorted_tokens[i]
+            bonus = 2 if token == term else 1
+            for object_id, weight in self.postings[token].items():
+                scores[object_id] = scores.get(object_id, 0) + weight * bonus
+            i += 1
+        return scores
+
+    def search(self, query, params=None):
+        params = params or {}
+        start = time.perf_counter()
+        terms = [token.lower() for token in tokenize(query)]
+        with self.lock:
+            scores = None
+            # every term has to match (as a word or a word prefix)
+            for term in terms:
+                matches = self.prefix_matches(term)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        object_id: score + matches[object_id]
+                        for object_id, score in scores.items()
+                        if object_id in matches
+                    }
+                if not scores:
+                    break
+            if scores is None:
+                scores = dict.fromkeys(self.records, 0)
+            tag_filters = params.get("tagFilters")
+            if tag_filters:
+                if isinstance(tag_filters, str):
+                    tag_filters = [tag_filters]
+                for tag in tag_filters:
+                    tagged = self.tags.get(tag, set())
+                    scores = {k: v for k, v in scores.items() if k in tagged}
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], int(item[0])))
+            hits = [self.records[object_id] for object_id, _ in ranked]
+        hits_per_page = params.get("hitsPerPage", 20)
+        page = params.get("page", 0)
+        page_hits = hits[page * hits_per_page : (page + 1) * hits_per_page]
+        return {
+            "hits": page_hits,
+            "nbHits": len(hits),
+            "page": page,
+            "nbPages": -(-len(hits) // hits_per_page),
+            "hitsPerPage": hits_per_page,
+            "query": query,
+            "params": params,
+            "processingTimeMS": int((time.perf_counter() - start) * 1000),
+        }
+
+    # & persistence
+    def save(self, path=None):
+        path = Path(path or self.path)
+        with self.lock:
+            data = {"stamp": self.stamp, "records": list(self.records.values())}
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(data, cls=DjangoJSONEncoder))
+        tmp_path.replace(path)
+
+    def load(self, path=None):
+        path = Path(path or self.path)
+        data = json.loads(path.read_text())
+        if isinstance(data, list):  # written before the stamp was saved
+            data = {"stamp": None, "records": data}
+        with self.lock:
+            self.clear()
+            for record in data["records"]:
+                self.add_record(record)
+            self.stamp = data["stamp"]
+
+
+def db_stamp():
+    """[count, max(updated_at)] of the products table, JSON friendly."""
+    stats = Product.objects.aggregate(count=Count("pk"), updated=Max("updated_at"))
+    updated = stats["updated"]
+    return [stats["count"], updated.isoformat() if updated else None]
+
+
+_local_index = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index():
+    """
+    Process wide index, loaded from settings.LOCAL_SEARCH_INDEX_PATH
+    or built from the database the first time it is needed.
+    A loaded file is reconciled with the database (and re-saved if it
+    was stale), after that the index is re-checked at most every
+    LOCAL_SEARCH_INDEX_REFRESH_SECONDS for writes made by other processes.
+    """
+    global _local_index
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                index = LocalSearchIndex(settings.LOCAL_SEARCH_INDEX_PATH)
+                if index.path.exists():
+                    index.load()
+                    changed = index.refresh()
+                else:
+                    index.build()
+                    changed = True
+                if changed:
+                    index.save()
+                _local_index = index
+                return index
+    _local_index.refresh_if_due(settings.LOCAL_SEARCH_INDEX_REFRESH_SECONDS)
+    return _local_index
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search.local_index import LocalSearchIndex
+
+
+class Command(BaseCommand):
+    help = "Build the local search index (Algolia stand-in) and write it to disk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None)
+        parser.add_argument(
+            "--benchmark",
+            nargs="*",
+            metavar="QUERY",
+            help="time each query against the freshly built index",
+        )
+        parser.add_argument("--repeat", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.LOCAL_SEARCH_INDEX_PATH
+        index = LocalSearchIndex(path)
+
+        start = time.perf_counter()
+        index.build()
+        index.save()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {len(index.records)} products into {path} in {elapsed:.3f}s"
+            )
+        )
+
+        for query in options["benchmark"] or []:
+            repeat = options["repeat"]
+            start = time.perf_counter()
+            for _ in range(repeat):
+                results = index.search(query)
+            per_query = (time.perf_counter() - start) / repeat * 1_000_000
+            self.stdout.write(
+                f"{query!r}: {results['nbHits']} hits, {per_query:.1f}us/query"
+            )
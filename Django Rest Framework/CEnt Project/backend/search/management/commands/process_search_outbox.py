@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search import outbox
+
+
+class Command(BaseCommand):
+    help = "Push dirty products from the search outbox to the search index in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--interval", type=float, default=1.0, help="seconds to sleep when idle"
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="drain the due rows and exit"
+        )
+        dead = parser.add_mutually_exclusive_group()
+        dead.add_argument(
+            "--retry-dead",
+            action="store_true",
+            help="queue the rows that ran out of attempts again before starting",
+        )
+        dead.add_argument(
+            "--purge-dead",
+            action="store_true",
+            help="delete the rows that ran out of attempts before starting",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["retry_dead"]:
+            self.stdout.write(f"requeued {outbox.retry_dead_letters()} dead rows")
+        elif options["purge_dead"]:
+            self.stdout.write(f"purged {outbox.purge_dead_letters()} dead rows")
+        total = 0
+        while True:
+            handled = outbox.flush(batch_size)
+            total += handled
+            if handled:
+                self.stdout.write(f"pushed {handled} products ({total} total)")
+                continue
+            if options["once"]:
+                dead = outbox.dead_letters().count()
+                if dead:
+                    self.stderr.write(
+                        f"{dead} rows ran out of attempts, see --retry-dead / --purge-dead"
+                    )
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} products pushed"))
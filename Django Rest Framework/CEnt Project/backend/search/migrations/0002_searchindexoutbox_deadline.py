@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_search_index_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchindexoutbox',
+            name='deadline',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,21 @@
 from django.db import models
 
+
 # Create your models here.
+class SearchIndexOutbox(models.Model):
+    """
+    One row per product whose search record is dirty. Saving a product
+    only writes (or bumps) its row; the process_search_outbox worker
+    pushes them to the search backend in batches.
+    """
+
+    product_id = models.BigIntegerField(unique=True)
+    enqueued_at = models.DateTimeField()
+    available_at = models.DateTimeField(db_index=True)
+    # set on first enqueue only: debouncing never pushes a row past it
+    deadline = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"product {self.product_id} (attempts={self.attempts})"
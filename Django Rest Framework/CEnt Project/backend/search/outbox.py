@@ -0,0 +1,148 @@
+import logging
+from datetime import timedelta
+
+from algoliasearch_django import algolia_engine
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import Product
+from .client import get_index
+from .models import SearchIndexOutbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BATCH_SIZE": 500,
+    # wait this long after the last save before pushing, so bursts coalesce
+    "DEBOUNCE_SECONDS": 2,
+    # but push at most this long after the first unpushed save, so a
+    # product saved over and over still gets indexed
+    "MAX_DELAY_SECONDS": 30,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_BACKOFF_SECONDS": 5,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "SEARCH_INDEX_OUTBOX", {}).get(name, DEFAULTS[name])
+
+
+def enqueue(product_ids):
+    """
+    Mark products as dirty. A product already waiting in the outbox is
+    not duplicated, its timers are just pushed back, up to the deadline
+    set when it was first enqueued.
+    """
+    now = timezone.now()
+    available_at = now + timedelta(seconds=get_setting("DEBOUNCE_SECONDS"))
+    deadline = now + timedelta(seconds=get_setting("MAX_DELAY_SECONDS"))
+    product_ids = set(product_ids)
+    rows = [
+        SearchIndexOutbox(
+            product_id=pk, enqueued_at=now, available_at=available_at, deadline=deadline
+        )
+        for pk in product_ids
+    ]
+    SearchIndexOutbox.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["product_id"],
+        update_fields=["enqueued_at", "available_at", "attempts", "last_error"],
+        batch_size=get_setting("BATCH_SIZE"),
+    )
+    # deadline isn't in update_fields, existing rows keep their first one
+    SearchIndexOutbox.objects.filter(
+        product_id__in=product_ids, available_at__gt=F("deadline")
+    ).update(available_at=F("deadline"))
+
+
+def push(products, deleted_ids):
+    """Send one batch to the search backend, returns product pk -> new hash."""
+    adapter = algolia_engine.get_adapter(Product)
+    index = get_index(adapter.index_name)
+    records, hashes = [], {}
+    for product in products:
+        if adapter._should_index(product):
+            record, new_hash = adapter.get_changes(product)
+            if record is not None:
+                records.append(record)
+                hashes[product.pk] = new_hash
+        elif product.index_hash:
+            deleted_ids.append(product.pk)
+            hashes[product.pk] = ""
+    if records:
+        index.save_objects(records)
+    if deleted_ids:
+        index.delete_objects(deleted_ids)
+    return hashes
+
+
+def flush(batch_size=None):
+    """
+    Process one batch of due outbox rows, returns how many were handled.
+    The batch stays locked (skip_locked) until it is pushed, so several
+    workers can run side by side without pushing the same rows.
+    """
+    batch_size = batch_size or get_setting("BATCH_SIZE")
+    max_attempts = get_setting("MAX_ATTEMPTS")
+    with transaction.atomic():
+        started = timezone.now()
+        rows = list(
+            SearchIndexOutbox.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=started, attempts__lt=max_attempts)
+            .order_by("available_at")[:batch_size]
+        )
+        if not rows:
+            return 0
+        ids = [row.product_id for row in rows]
+        products = list(Product.objects.select_related("user").filter(pk__in=ids))
+        found = {product.pk for product in products}
+        deleted_ids = [pk for pk in ids if pk not in found]
+
+        try:
+            hashes = push(products, deleted_ids)
+        except Exception as exc:
+            logger.warning("search outbox push failed for %s products: %s", len(rows), exc)
+            dead = []
+            for row in rows:
+                row.attempts += 1
+                backoff = get_setting("RETRY_BACKOFF_SECONDS") * 2 ** (row.attempts - 1)
+                row.available_at = timezone.now() + timedelta(seconds=backoff)
+                row.last_error = str(exc)
+                if row.attempts >= max_attempts:
+                    dead.append(row.product_id)
+            SearchIndexOutbox.objects.bulk_update(
+                rows, ["attempts", "available_at", "last_error"]
+            )
+            if dead:
+                logger.error(
+                    "search outbox gave up on %s products after %s attempts: %s",
+                    len(dead), max_attempts, dead,
+                )
+            return 0
+
+        Product.objects.bulk_update(
+            [Product(pk=pk, index_hash=new_hash) for pk, new_hash in hashes.items()],
+            ["index_hash"],
+        )
+        # rows bumped while we were pushing stay queued for the next flush
+        SearchIndexOutbox.objects.filter(
+            product_id__in=ids, enqueued_at__lte=started
+        ).delete()
+    return len(rows)
+
+
+# & dead letters: rows that failed MAX_ATTEMPTS times, flush() skips them
+def dead_letters():
+    return SearchIndexOutbox.objects.filter(attempts__gte=get_setting("MAX_ATTEMPTS"))
+
+
+def retry_dead_letters():
+    """Queue the dead rows again with a fresh set of attempts."""
+    return dead_letters().update(attempts=0, available_at=timezone.now(), last_error="")
+
+
+def purge_dead_letters():
+    return dead_letters().delete()[0]
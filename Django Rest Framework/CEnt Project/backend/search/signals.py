@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import Product
+from . import local_index, outbox
+
+
+@receiver(post_save, sender=Product)
+def update_local_index(sender, instance, *args, **kwargs):
+    # only keep it in sync once this process has loaded it
+    if local_index._local_index is not None:
+        local_index._local_index.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_local_index(sender, instance, *args, **kwargs):
+    if local_index._local_index is not None:
+        local_index._local_index.remove_record(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def enqueue_search_sync(sender, instance, *args, **kwargs):
+    # written in the same transaction as the product, pushed later by the worker
+    outbox.enqueue([instance.pk])
@@ -1,3 +1,312 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from algoliasearch.exceptions import AlgoliaUnreachableHostException
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from products.models import Product
+from products.tests import RecordingIndex
+from . import local_index, outbox
+from .client import perform_search
+from .local_index import LocalSearchIndex, get_local_index
+from .models import SearchIndexOutbox
+
+
+def hit_titles(results):
+    return [hit["title"] for hit in results["hits"]]
+
+
+class LocalSearchIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("search", password="pw")
+        self.camera = Product.objects.create(user=self.user, title="vintage camera", content="boxed")
+        self.strap = Product.objects.create(user=self.user, title="strap", content="fits any camera")
+        Product.objects.create(user=self.user, title="speed boat", content="fast")
+        Product.objects.create(user=self.user, title="hidden camera", public=False)
+        self.index = LocalSearchIndex()
+        self.index.build()
+
+    def test_title_outranks_content(self):
+        self.assertEqual(hit_titles(self.index.search("camera")), ["vintage camera", "strap"])
+
+    def test_prefix_and_every_term(self):
+        self.assertEqual(hit_titles(self.index.search("cam")), ["vintage camera", "strap"])
+        self.assertEqual(hit_titles(self.index.search("camera fits")), ["strap"])
+        self.assertEqual(self.index.search("plane")["nbHits"], 0)
+
+    def test_tag_filter_and_paging(self):
+        results = self.index.search("camera", {"tagFilters": "cameras", "hitsPerPage": 1, "page": 1})
+        self.assertEqual(hit_titles(results), ["strap"])
+        self.assertEqual((results["nbHits"], results["nbPages"]), (2, 2))
+        self.assertEqual(self.index.search("camera", {"tagFilters": ["boats"]})["nbHits"], 0)
+
+    def test_remove_record(self):
+        self.index.remove_record(self.camera.pk)
+        self.assertEqual(hit_titles(self.index.search("camera")), ["strap"])
+        self.assertNotIn("vintage", self.index.sorted_tokens)
+
+    def test_refresh_picks_up_other_writers(self):
+        # e.g. another worker process, no signal reaches this index
+        Product.objects.filter(pk=self.strap.pk).delete()
+        Product.objects.create(user=self.user, title="camera bag")
+        self.assertTrue(self.index.refresh())
+        self.assertEqual(hit_titles(self.index.search("camera")), ["vintage camera", "camera bag"])
+        self.assertFalse(self.index.refresh())
+
+    def test_refresh_sees_updates(self):
+        self.camera.title = "vintage lens"
+        self.camera.save()
+        self.index.refresh()
+        self.assertEqual(hit_titles(self.index.search("vintage")), ["vintage lens"])
+
+
+class LocalIndexSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("search", password="pw")
+        self.product = Product.objects.create(user=self.user, title="vintage camera")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "index.json"
+        override = override_settings(LOCAL_SEARCH_INDEX_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        # a new process
+        local_index._local_index = None
+
+    def test_signals_keep_the_loaded_index_in_sync(self):
+        index = get_local_index()
+        self.product.title = "vintage lens"
+        self.product.save()
+        other = Product.objects.create(user=self.user, title="lens cap")
+        self.assertEqual(hit_titles(index.search("lens")), ["vintage lens", "lens cap"])
+        other.delete()
+        self.product.public = False
+        self.product.save()
+        self.assertEqual(index.search("lens")["nbHits"], 0)
+
+    def test_first_use_builds_and_saves(self):
+        index = get_local_index()
+        self.assertEqual(hit_titles(index.search("camera")), ["vintage camera"])
+        data = json.loads(self.path.read_text())
+        self.assertEqual(len(data["records"]), 1)
+        self.assertEqual(data["stamp"], index.stamp)
+
+    def test_stale_file_is_reconciled_on_load(self):
+        get_local_index()
+        self.reset()
+        # written while no process had the index loaded
+        self.product.title = "vintage lens"
+        self.product.save()
+        Product.objects.create(user=self.user, title="lens cap")
+        index = get_local_index()
+        self.assertEqual(hit_titles(index.search("lens")), ["vintage lens", "lens cap"])
+        self.assertEqual(index.search("camera")["nbHits"], 0)
+        self.assertEqual(len(json.loads(self.path.read_text())["records"]), 2)
+
+    def test_deleted_products_are_dropped_on_load(self):
+        get_local_index()
+        self.reset()
+        Product.objects.all().delete()
+        self.assertEqual(get_local_index().search("camera")["nbHits"], 0)
+
+    def test_old_file_format_is_rebuilt(self):
+        self.path.write_text(json.dumps([{"objectID": "999", "title": "ghost", "_tags": []}]))
+        index = get_local_index()
+        self.assertEqual(index.search("ghost")["nbHits"], 0)
+        self.assertEqual(hit_titles(index.search("camera")), ["vintage camera"])
+
+    @override_settings(LOCAL_SEARCH_INDEX_REFRESH_SECONDS=0)
+    def test_loaded_index_is_rechecked(self):
+        get_local_index()
+        with mock.patch("search.signals.local_index"):
+            # written by another process, no signal reaches this index
+            Product.objects.create(user=self.user, title="camera bag")
+        self.assertEqual(hit_titles(get_local_index().search("camera")), ["vintage camera", "camera bag"])
+
+
+@override_settings(LOCAL_SEARCH_INDEX_PATH=Path(tempfile.gettempdir()) / "unused-search-index.json")
+class PerformSearchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user("search", password="pw")
+        Product.objects.create(user=user, title="vintage camera")
+        local_index._local_index = LocalSearchIndex()
+        local_index._local_index.build()
+        self.addCleanup(setattr, local_index, "_local_index", None)
+
+    def test_algolia(self):
+        index = mock.Mock()
+        index.search.return_value = {"hits": [{"title": "from algolia"}]}
+        with mock.patch("search.client.get_index", return_value=index):
+            results = perform_search("camera", tags="cameras")
+        self.assertEqual(hit_titles(results), ["from algolia"])
+        index.search.assert_called_once_with("camera", {"tagFilters": "cameras"})
+
+    def test_falls_back_to_the_local_index(self):
+        index = mock.Mock()
+        index.search.side_effect = AlgoliaUnreachableHostException("Unreachable hosts")
+        with mock.patch("search.client.get_index", return_value=index):
+            results = perform_search("camera", tags="cameras")
+        self.assertEqual(hit_titles(results), ["vintage camera"])
+
+    @override_settings(SEARCH_ENGINE="local")
+    def test_local_engine(self):
+        with mock.patch("search.client.get_index") as get_index:
+            results = perform_search("cam")
+        get_index.assert_not_called()
+        self.assertEqual(hit_titles(results), ["vintage camera"])
+
+
+class FailingIndex(RecordingIndex):
+    def save_objects(self, records):
+        raise ConnectionError("algolia down")
+
+
+@override_settings(
+    SEARCH_INDEX_OUTBOX={
+        "BATCH_SIZE": 10,
+        "DEBOUNCE_SECONDS": 2,
+        "MAX_DELAY_SECONDS": 30,
+        "MAX_ATTEMPTS": 3,
+        "RETRY_BACKOFF_SECONDS": 5,
+    }
+)
+class SearchOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("outbox", password="pw")
+        self.now = timezone.now()
+        self.index = RecordingIndex()
+        patcher = mock.patch("search.outbox.get_index", side_effect=lambda *args: self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def at(self, seconds):
+        """Move the outbox clock to `seconds` after the start of the test."""
+        patcher = mock.patch("search.outbox.timezone.now", return_value=self.now + timedelta(seconds=seconds))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def row(self, product):
+        return SearchIndexOutbox.objects.get(product_id=product.pk)
+
+    def create(self, title):
+        self.at(0)
+        return Product.objects.create(user=self.user, title=title)
+
+    def test_saves_are_debounced(self):
+        product = self.create("camera")
+        self.assertEqual(self.row(product).available_at, self.now + timedelta(seconds=2))
+        self.at(1)
+        outbox.enqueue([product.pk, product.pk])
+        self.assertEqual(SearchIndexOutbox.objects.count(), 1)
+        self.assertEqual(self.row(product).available_at, self.now + timedelta(seconds=3))
+        self.at(2.5)
+        self.assertEqual(outbox.flush(), 0)
+        self.at(3)
+        self.assertEqual(outbox.flush(), 1)
+        self.assertEqual(self.index.saved_titles(), ["camera"])
+        self.assertFalse(SearchIndexOutbox.objects.exists())
+
+    def test_debouncing_stops_at_the_deadline(self):
+        product = self.create("camera")
+        for second in range(40):
+            self.at(second)
+            outbox.enqueue([product.pk])
+        row = self.row(product)
+        self.assertEqual(row.deadline, self.now + timedelta(seconds=30))
+        self.assertEqual(row.available_at, row.deadline)
+        self.at(30)
+        self.assertEqual(outbox.flush(), 1)
+
+    def test_deletes_are_pushed(self):
+        product = self.create("camera")
+        self.at(5)
+        outbox.flush()
+        pk = product.pk
+        self.at(6)
+        product.delete()
+        self.at(10)
+        outbox.flush()
+        self.assertEqual(self.index.deleted, [[pk]])
+
+    def test_unchanged_records_are_not_pushed_again(self):
+        product = self.create("camera")
+        self.at(5)
+        outbox.flush()
+        hashed = Product.objects.get(pk=product.pk).index_hash
+        self.assertNotEqual(hashed, "")
+        outbox.enqueue([product.pk])  # e.g. saved without changes
+        self.at(10)
+        self.assertEqual(outbox.flush(), 1)
+        self.assertEqual(self.index.saved_titles(), ["camera"])
+        self.assertEqual(Product.objects.get(pk=product.pk).index_hash, hashed)
+
+    def test_rows_bumped_during_a_push_stay_queued(self):
+        product = self.create("camera")
+
+        def save_objects(records):
+            self.index.saved.append(list(records))
+            SearchIndexOutbox.objects.filter(product_id=product.pk).update(
+                enqueued_at=self.now + timedelta(seconds=6)
+            )
+
+        self.index.save_objects = save_objects
+        self.at(5)
+        outbox.flush()
+        self.assertTrue(SearchIndexOutbox.objects.filter(product_id=product.pk).exists())
+
+    def test_failed_pushes_back_off_then_dead_letter(self):
+        product = self.create("camera")
+        self.index = FailingIndex()
+        elapsed = 2
+        with self.assertLogs("search.outbox", "WARNING") as logs:
+            for attempt, backoff in enumerate([5, 10, 20], start=1):
+                self.at(elapsed)
+                self.assertEqual(outbox.flush(), 0)
+                row = self.row(product)
+                self.assertEqual(row.attempts, attempt)
+                self.assertEqual(row.last_error, "algolia down")
+                self.assertEqual(row.available_at, self.now + timedelta(seconds=elapsed + backoff))
+                elapsed += backoff
+        self.assertIn(f"gave up on 1 products after 3 attempts: [{product.pk}]", logs.output[-1])
+        self.at(elapsed + 3600)
+        self.assertEqual(outbox.flush(), 0)
+        self.assertEqual(list(outbox.dead_letters()), [self.row(product)])
+
+    def test_dead_letters_can_be_retried_or_purged(self):
+        product = self.create("camera")
+        SearchIndexOutbox.objects.update(attempts=3, last_error="algolia down")
+        out = StringIO()
+        err = StringIO()
+        self.at(5)
+        call_command("process_search_outbox", "--once", stdout=out, stderr=err)
+        self.assertIn("1 rows ran out of attempts", err.getvalue())
+        call_command("process_search_outbox", "--once", "--retry-dead", stdout=out)
+        self.assertIn("requeued 1 dead rows", out.getvalue())
+        self.assertEqual(self.index.saved_titles(), ["camera"])
+        self.assertFalse(SearchIndexOutbox.objects.exists())
+
+        outbox.enqueue([product.pk])
+        SearchIndexOutbox.objects.update(attempts=3)
+        call_command("process_search_outbox", "--once", "--purge-dead", stdout=out)
+        self.assertIn("purged 1 dead rows", out.getvalue())
+        self.assertFalse(SearchIndexOutbox.objects.exists())
+
+    def test_batch_is_locked_and_skips_locked_rows(self):
+        self.create("camera")
+        self.at(5)
+        with mock.patch.object(
+            SearchIndexOutbox.objects, "select_for_update", wraps=SearchIndexOutbox.objects.select_for_update
+        ) as select_for_update:
+            outbox.flush()
+        select_for_update.assert_called_once_with(skip_locked=True)
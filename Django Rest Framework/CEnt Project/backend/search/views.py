@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from products.models import *
 from products.serializers import *
 from .client import *
+from api.pagination import OptInCursorPagination
 
 
 class SearchListViewAlgolia(generics.GenericAPIView):
@@ -16,8 +17,10 @@ class SearchListViewAlgolia(generics.GenericAPIView):
 
 
 class SearchListView(generics.ListAPIView):
-    queryset = Product.objects.all()
+    queryset = Product.objects.with_pricing()
     serializer_class = ProductSerializer
+    # ?paginate=cursor orders by id (or price) instead of search rank
+    pagination_class = OptInCursorPagination
 
     def get_queryset(self, *args, **kwargs):
         qs = super().get_queryset(*args, **kwargs)
@@ -1,8 +1,50 @@
-from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 import requests
+from requests.adapters import HTTPAdapter
 from getpass import getpass
+import base64
 import pathlib
 import json
+import threading
+import time
+
+
+def make_session(pool_size=10):
+    """
+    One keep-alive connection pool shared by
+    every request (and every worker thread)
+    instead of a new TCP/TLS handshake per call.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def token_expires_at(token):
+    """
+    Read the `exp` claim of a JWT without
+    verifying its signature (only the server
+    can do that). Returns None if the token
+    can't be decoded.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class LoginRequired(Exception):
+    """
+    Raised when new credentials are needed
+    outside the main thread, where nobody
+    can answer the login prompt.
+    """
 
 
 @dataclass
@@ -21,8 +63,21 @@ class JWTClient:
     product_endpoint = "http://localhost:8000"
     # this file path is insecure
     cred_path: pathlib.Path = pathlib.Path("creds.json")
+    # endpoint -> (ETag, data), replayed when the server answers 304;
+    # least recently used pages are dropped past etag_cache_size
+    etag_cache: OrderedDict = field(default_factory=OrderedDict)
+    etag_cache_size: int = 32
+    # threads used by iter_all(parallel_offsets=True)
+    workers: int = 4
+    # refresh tokens that expire within this many seconds
+    expiry_leeway: int = 5
+    session: requests.Session = field(default=None, repr=False)
 
     def __post_init__(self):
+        if self.session is None:
+            self.session = make_session(pool_size=max(self.workers, 1))
+        self._refresh_lock = threading.Lock()
+        self._etag_lock = threading.Lock()
         if self.cred_path.exists():
             """
             You have stored creds,
@@ -52,12 +107,12 @@ class JWTClient:
                 """
                 self.access = data.get("access")
                 self.refresh = data.get("refresh")
-                token_verified = self.verify_token()
+                token_verified = not self.token_expired(self.access)
                 if not token_verified:
                     """
-                    This can mean the token has expired
-                    or is invalid. Either way, attempt
-                    a refresh.
+                    The access token has expired (checked
+                    locally, no /token/verify/ round trip).
+                    Attempt a refresh.
                     """
                     refreshed = self.perform_refresh()
                     if not refreshed:
@@ -74,6 +129,50 @@ class JWTClient:
             """
             self.perform_auth()
 
+    def token_expired(self, token):
+        """
+        Local expiry check from the `exp` claim.
+        A token that is rejected anyway (revoked,
+        bad signature) is caught by the 401 retry
+        in `request()`.
+        """
+        exp = token_expires_at(token)
+        return exp is None or exp - self.expiry_leeway <= time.time()
+
+    def ensure_access(self):
+        """
+        Refresh the access token before a request
+        if it is about to expire.
+        """
+        if self.access and not self.token_expired(self.access):
+            return
+        with self._refresh_lock:
+            # another thread may have refreshed it meanwhile
+            if self.access and not self.token_expired(self.access):
+                return
+            if not self.perform_refresh():
+                self.perform_auth()
+
+    def request(self, method, endpoint, headers=None, **kwargs):
+        """
+        Authenticated request through the pooled
+        session. On a 401 the token is refreshed
+        once and the request retried.
+        """
+        self.ensure_access()
+        access = self.access
+        r = self.session.request(
+            method, endpoint, headers={**self.get_headers(), **(headers or {})}, **kwargs
+        )
+        if r.status_code == 401:
+            with self._refresh_lock:
+                if self.access == access and not self.perform_refresh():
+                    self.perform_auth()
+            r = self.session.request(
+                method, endpoint, headers={**self.get_headers(), **(headers or {})}, **kwargs
+            )
+        return r
+
     def get_headers(self, header_type=None):
         """
         Default headers for HTTP requests
@@ -91,10 +190,12 @@ class JWTClient:
         Without exposing password(s) during the
         collection process.
         """
+        if threading.current_thread() is not threading.main_thread():
+            raise LoginRequired("Tokens expired, log in again from the main thread.")
         endpoint = f"{self.base_endpoint}/token/"
         username = input("What is your username?\n")
         password = getpass("What is your password?\n")
-        r = requests.post(endpoint, json={"username": username, "password": password})
+        r = self.session.post(endpoint, json={"username": username, "password": password})
         if r.status_code != 200:
             raise Exception(f"Access not granted: {r.text}")
         print("access granted")
@@ -118,10 +219,11 @@ class JWTClient:
         token data. This method only verifies
         your `access` token. A 200 HTTP status
         means success, anything else means failure.
+        `token_expired()` is the cheap local check.
         """
         data = {"token": f"{self.access}"}
         endpoint = f"{self.base_endpoint}/token/verify/"
-        r = requests.post(endpoint, json=data)
+        r = self.session.post(endpoint, json=data)
         return r.status_code == 200
 
     def clear_tokens(self):
@@ -141,10 +243,12 @@ class JWTClient:
         auth headers and the refresh token.
         """
         print("Refreshing token.")
-        headers = self.get_headers()
+        if not self.refresh or self.token_expired(self.refresh):
+            self.clear_tokens()
+            return False
         data = {"refresh": f"{self.refresh}"}
         endpoint = f"{self.base_endpoint}/token/refresh/"
-        r = requests.post(endpoint, json=data, headers=headers)
+        r = self.session.post(endpoint, json=data)
         if r.status_code != 200:
             self.clear_tokens()
             return False
@@ -156,23 +260,117 @@ class JWTClient:
         self.write_creds(stored_data)
         return True
 
-    def list(self, endpoint=None, limit=3):
+    def get_cached_page(self, endpoint):
+        with self._etag_lock:
+            cached = self.etag_cache.get(endpoint)
+            if cached is not None:
+                self.etag_cache.move_to_end(endpoint)
+            return cached
+
+    def cache_page(self, endpoint, etag, data):
+        with self._etag_lock:
+            self.etag_cache[endpoint] = (etag, data)
+            self.etag_cache.move_to_end(endpoint)
+            while len(self.etag_cache) > self.etag_cache_size:
+                self.etag_cache.popitem(last=False)
+
+    def list(self, endpoint=None, limit=3, cursor=False, offset=None, use_cache=True):
         """
         Here is an actual api call to a DRF
         View that requires our simplejwt Authentication
         Working correctly.
+        `cursor=True` asks the endpoint for keyset
+        (cursor) pagination instead of limit/offset.
+        `use_cache=False` skips the ETag cache, for
+        pages that won't be asked for again.
         """
-        headers = self.get_headers()
         if endpoint is None or self.product_endpoint not in str(endpoint):
             endpoint = f"{self.product_endpoint}/products/?limit={limit}"
-        print(headers)
+            if cursor:
+                endpoint += "&paginate=cursor"
+            elif offset:
+                endpoint += f"&offset={offset}"
+        return self.get_page(endpoint, use_cache=use_cache)
+
+    def get_page(self, endpoint, use_cache=True):
+        """
+        GET one page exactly as given, e.g. a
+        `next` link (its host may not match
+        `product_endpoint` behind a proxy).
+        """
         print(endpoint)
-        r = requests.get(endpoint, headers=headers)
+        headers = {}
+        cached = self.get_cached_page(endpoint) if use_cache else None
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        r = self.request("GET", endpoint, headers=headers)
+        if r.status_code == 304 and cached is not None:
+            return cached[1]
         if r.status_code != 200:
             raise Exception(f"Request not complete {r.text}")
         data = r.json()
+        if use_cache and r.headers.get("ETag"):
+            self.cache_page(endpoint, r.headers["ETag"], data)
         return data
 
+    def iter_all(self, limit=50, parallel_offsets=False, workers=None):
+        """
+        Yield every product, in order, by following
+        the cursor `next` links; the next page is
+        fetched in a background thread while the
+        current one is being consumed.
+        `parallel_offsets=True` fans out over
+        limit/offset pages with `workers` threads
+        instead. That can win over a slow link,
+        but every page costs the server a COUNT(*)
+        and a deeper OFFSET.
+        """
+        if parallel_offsets:
+            yield from self.iter_offsets(limit=limit, workers=workers)
+        else:
+            yield from self.iter_cursor(limit=limit)
+
+    def iter_cursor(self, limit=50):
+        """
+        Yield every product by following the
+        cursor `next` links, one page prefetched.
+        If the tokens run out in the prefetch
+        thread, LoginRequired is raised here.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            data = self.list(limit=limit, cursor=True, use_cache=False)
+            while True:
+                next_url = data.get("next")
+                following = None
+                if next_url:
+                    following = executor.submit(self.get_page, next_url, use_cache=False)
+                yield from data.get("results", [])
+                if following is None:
+                    break
+                data = following.result()
+
+    def iter_offsets(self, limit=50, workers=None):
+        """
+        Yield every product from limit/offset pages:
+        the first page gives `count`, the rest are
+        fetched concurrently over the pooled session.
+        """
+        workers = max(self.workers if workers is None else workers, 1)
+        first = self.list(limit=limit, use_cache=False)
+        yield from first.get("results", [])
+        offsets = range(limit, first.get("count") or 0, limit)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # at most `workers` pages in flight / buffered at a time
+            pending = []
+            for offset in offsets:
+                pending.append(
+                    executor.submit(self.list, limit=limit, offset=offset, use_cache=False)
+                )
+                if len(pending) >= workers:
+                    yield from pending.pop(0).result().get("results", [])
+            for future in pending:
+                yield from future.result().get("results", [])
+
 
 if __name__ == "__main__":
     """
@@ -182,7 +380,7 @@ if __name__ == "__main__":
     # this will either prompt a login process
     # or just run with current stored data
     client = JWTClient()
-    print(client.verify_token())
+    print("access token expired:", client.token_expired(client.access))
 
     # simple instance method to perform an HTTP
     # request to our /api/products/ endpoint
@@ -192,6 +390,10 @@ if __name__ == "__main__":
     next_url = lookup_1_data.get("next")
     print("First lookup result length", len(results))
     if next_url:
-        lookup_2_data = client.list(endpoint=next_url)
+        lookup_2_data = client.get_page(next_url)
         results += lookup_2_data.get("results")
         print("Second lookup result length", len(results))
+
+    # walk the full catalogue with cursor pagination
+    all_products = list(client.iter_all(limit=50))
+    print("Total products", len(all_products))
@@ -0,0 +1,172 @@
+"""
+JWTClient tests against a fake session, no server needed:
+    cd frontend && python -m unittest tests
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+import base64
+import json
+import pathlib
+import tempfile
+import time
+
+from jwt import JWTClient, LoginRequired
+
+
+def make_token(expires_in):
+    payload = json.dumps({"exp": int(time.time()) + expires_in}).encode()
+    return "header." + base64.urlsafe_b64encode(payload).decode().rstrip("=") + ".signature"
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Answers from a list of (method, url) -> response, records the calls."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.calls.append((method, url, dict(headers or {})))
+        expected, response = self.responses.pop(0)
+        assert expected == (method, url), f"expected {expected}, got {(method, url)}"
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+
+class JWTClientTestCase(TestCase):
+    def make_client(self, responses, access=None, refresh=None, **kwargs):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cred_path = pathlib.Path(tmp.name) / "creds.json"
+        self.access = access or make_token(300)
+        self.refresh = refresh or make_token(3600)
+        cred_path.write_text(json.dumps({"access": self.access, "refresh": self.refresh}))
+        self.session = FakeSession(responses)
+        patcher = mock.patch("builtins.input", side_effect=AssertionError("prompted"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return JWTClient(cred_path=cred_path, session=self.session, **kwargs)
+
+    def authorization(self, call):
+        return call[2].get("Authorization")
+
+
+class RequestRetryTests(JWTClientTestCase):
+    url = "http://localhost:8000/products/?limit=3"
+    refresh_url = "http://localhost:8000/api/token/refresh/"
+
+    def test_401_refreshes_once_and_retries(self):
+        new_access = make_token(300)
+        client = self.make_client([
+            (("GET", self.url), FakeResponse(401)),
+            (("POST", self.refresh_url), FakeResponse(200, {"access": new_access})),
+            (("GET", self.url), FakeResponse(200, {"results": []})),
+        ])
+        response = client.request("GET", self.url)
+        self.assertEqual(response.status_code, 200)
+        get_calls = [call for call in self.session.calls if call[0] == "GET"]
+        self.assertEqual(self.authorization(get_calls[0]), f"Bearer {self.access}")
+        self.assertEqual(self.authorization(get_calls[1]), f"Bearer {new_access}")
+        self.assertEqual(json.loads(client.cred_path.read_text())["access"], new_access)
+
+    def test_second_401_is_returned(self):
+        client = self.make_client([
+            (("GET", self.url), FakeResponse(401)),
+            (("POST", self.refresh_url), FakeResponse(200, {"access": make_token(300)})),
+            (("GET", self.url), FakeResponse(401)),
+        ])
+        self.assertEqual(client.request("GET", self.url).status_code, 401)
+        self.assertEqual(self.session.responses, [])
+
+    def test_worker_thread_does_not_prompt(self):
+        # refresh rejected: the main thread would log in again, a worker can't
+        client = self.make_client([
+            (("GET", self.url), FakeResponse(401)),
+            (("POST", self.refresh_url), FakeResponse(401)),
+        ])
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(client.request, "GET", self.url)
+            with self.assertRaises(LoginRequired):
+                future.result()
+
+    def test_expired_access_is_refreshed_before_the_request(self):
+        new_access = make_token(300)
+        client = self.make_client([
+            (("POST", self.refresh_url), FakeResponse(200, {"access": new_access})),
+            (("GET", self.url), FakeResponse(200, {})),
+        ], access=make_token(-10))
+        client.request("GET", self.url)
+        self.assertEqual(self.authorization(self.session.calls[-1]), f"Bearer {new_access}")
+
+
+class ETagCacheTests(JWTClientTestCase):
+    def url(self, limit):
+        return f"http://localhost:8000/products/?limit={limit}"
+
+    def page(self, limit, etag):
+        return ("GET", self.url(limit)), FakeResponse(200, {"limit": limit}, {"ETag": etag})
+
+    def test_304_replays_the_cached_page(self):
+        client = self.make_client([
+            self.page(1, 'W/"a"'),
+            (("GET", self.url(1)), FakeResponse(304)),
+        ])
+        self.assertEqual(client.list(limit=1), {"limit": 1})
+        self.assertEqual(client.list(limit=1), {"limit": 1})
+        self.assertEqual(self.session.calls[1][2]["If-None-Match"], 'W/"a"')
+
+    def test_least_recently_used_page_is_dropped(self):
+        client = self.make_client([
+            self.page(1, 'W/"1"'),
+            self.page(2, 'W/"2"'),
+            (("GET", self.url(1)), FakeResponse(304)),
+            self.page(3, 'W/"3"'),
+        ], etag_cache_size=2)
+        client.list(limit=1)
+        client.list(limit=2)
+        client.list(limit=1)  # 1 is now more recent than 2
+        client.list(limit=3)
+        self.assertEqual(list(client.etag_cache), [self.url(1), self.url(3)])
+
+    def test_use_cache_false_skips_the_cache(self):
+        client = self.make_client([self.page(1, 'W/"1"')])
+        client.list(limit=1, use_cache=False)
+        self.assertNotIn("If-None-Match", self.session.calls[0][2])
+        self.assertEqual(len(client.etag_cache), 0)
+
+
+class CursorIterationTests(JWTClientTestCase):
+    first = "http://localhost:8000/products/?limit=2&paginate=cursor"
+
+    def test_follows_next_links_verbatim(self):
+        # behind a proxy the links name another host: they are still followed
+        second = "http://api.internal:8000/products/?cursor=cD0y&limit=2&paginate=cursor"
+        third = "http://api.internal:8000/products/?cursor=cD00&limit=2&paginate=cursor"
+        client = self.make_client([
+            (("GET", self.first), FakeResponse(200, {"next": second, "results": [1, 2]})),
+            (("GET", second), FakeResponse(200, {"next": third, "results": [3, 4]})),
+            (("GET", third), FakeResponse(200, {"next": None, "results": [5]})),
+        ])
+        self.assertEqual(list(client.iter_all(limit=2)), [1, 2, 3, 4, 5])
+        self.assertEqual([call[1] for call in self.session.calls], [self.first, second, third])
+        self.assertEqual(len(client.etag_cache), 0)
+
+    def test_single_page(self):
+        client = self.make_client([
+            (("GET", self.first), FakeResponse(200, {"next": None, "results": [1]})),
+        ])
+        self.assertEqual(list(client.iter_cursor(limit=2)), [1])
@@ -1,19 +1,6 @@
-import csv
-from redis_intro.models import Products
+from redis_intro.csv_import import import_products
 
 
 def import_data():
-    with open("products.csv", newline="", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        products = []
-
-        for row in reader:
-            products.append(
-                Products(
-                    name=row["name"],
-                    hs_code=row["hs_code"],
-                    price=row["price"],
-                )
-            )
-
-        Products.objects.bulk_create(products)
+    # streamed in batches, see `manage.py import_products` for the options
+    return import_products("products.csv")
@@ -0,0 +1,352 @@
+import json
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache, omit_exception
+from django_redis.exceptions import ConnectionInterrupted
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """
+    Bounded in-process store of pickled values. Size is accounted in
+    pickled bytes; least recently used entries go first.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.data = OrderedDict()  # key -> (payload, expires_at)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        # bumped by every delete / clear, see TwoTierRedisCache.get
+        self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                self.stats["misses"] += 1
+                return None
+            payload, expires_at = item
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                self.stats["misses"] += 1
+                return None
+            self.data.move_to_end(key)
+            self.stats["hits"] += 1
+            return payload
+
+    def set(self, key, payload, timeout, generation=None):
+        """
+        With `generation`, the value is only stored if nothing was
+        invalidated since that generation was read.
+        """
+        size = len(payload)
+        with self.lock:
+            self._pop(key)
+            if size > self.max_bytes or generation not in (None, self.generation):
+                return
+            while self.bytes + size > self.max_bytes:
+                self._pop(next(iter(self.data)))
+                self.stats["evictions"] += 1
+            self.data[key] = (payload, time.monotonic() + timeout)
+            self.bytes += size
+
+    def delete(self, key):
+        with self.lock:
+            self._pop(key)
+            self.generation += 1
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.bytes = 0
+            self.generation += 1
+
+    def _pop(self, key):
+        item = self.data.pop(key, None)
+        if item is not None:
+            self.bytes -= len(item[0])
+
+
+class LocalTier:
+    """
+    The per-process half of TwoTierRedisCache: the LRU plus the thread
+    listening for invalidation messages. Django creates a cache backend
+    per thread, so one tier is shared by all of them (see get_local_tier).
+    """
+
+    def __init__(self, channel, max_bytes):
+        self.channel = channel
+        self.lru = LocalLRU(max_bytes)
+        self.node_id = uuid.uuid4().hex
+        self.subscribed = threading.Event()
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def ensure_listener(self, get_redis):
+        # started lazily, so forked workers each get their own thread
+        if self.listener is not None and self.listener.is_alive():
+            return
+        with self.lock:
+            if self.listener is None or not self.listener.is_alive():
+                self.subscribed.clear()
+                self.listener = threading.Thread(
+                    target=self.listen, args=(get_redis,), name="cache-invalidation", daemon=True
+                )
+                self.listener.start()
+
+    def listen(self, get_redis):
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.lru.clear()
+                self.subscribed.set()
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle_message(message["data"])
+            except Exception:
+                logger.exception("cache invalidation subscription lost")
+            # messages may have been missed, stop trusting the local tier
+            self.subscribed.clear()
+            self.lru.clear()
+            time.sleep(1)
+
+    def handle_message(self, data):
+        message = json.loads(data)
+        if message.get("origin") == self.node_id:
+            return
+        if message.get("clear"):
+            self.lru.clear()
+        for key in message.get("keys", ()):
+            self.lru.delete(key)
+
+    def publish(self, redis, keys=(), clear=False):
+        message = {"origin": self.node_id, "keys": list(keys), "clear": clear}
+        redis.publish(self.channel, json.dumps(message))
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+def get_local_tier(location, channel, max_bytes):
+    with _local_tiers_lock:
+        key = (str(location), channel)
+        if key not in _local_tiers:
+            _local_tiers[key] = LocalTier(channel, max_bytes)
+        return _local_tiers[key]
+
+
+class TwoTierRedisCache(RedisCache):
+    """
+    django_redis with a per-process LRU in front of it.
+
+    Reads are served from local memory when possible, and misses are
+    filled from Redis. Every write, delete, incr or TTL change (touch,
+    expire, persist ...) goes to Redis and publishes the touched keys on
+    INVALIDATION_CHANNEL, and each process
+    drops them from its LRU when the message arrives. A value read from
+    Redis is not kept if an invalidation landed while it was in flight,
+    since it may be the old one. The local tier is only used while this
+    process is subscribed, and it is emptied whenever the subscription
+    (re)starts, so missed messages can't leave stale entries.
+    LOCAL_TIMEOUT bounds how long a value lives locally in any case.
+    Redis errors, publishing included, follow django_redis's
+    IGNORE_EXCEPTIONS like every other call.
+
+    OPTIONS (on top of django_redis's):
+        LOCAL_MAX_BYTES       default 32 MiB
+        LOCAL_TIMEOUT         default 60 seconds
+        INVALIDATION_CHANNEL  default "django-cache:invalidate"
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get("OPTIONS", {})
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 60)
+        self.tier = get_local_tier(
+            server,
+            options.get("INVALIDATION_CHANNEL", "django-cache:invalidate"),
+            options.get("LOCAL_MAX_BYTES", 32 * 1024 * 1024),
+        )
+        self.local = self.tier.lru
+        self.subscribed = self.tier.subscribed
+
+    def get_redis(self):
+        return self.client.get_client(write=True)
+
+    def ensure_listener(self):
+        self.tier.ensure_listener(self.get_redis)
+
+    @omit_exception
+    def publish(self, keys=(), clear=False):
+        try:
+            self.tier.publish(self.get_redis(), keys=keys, clear=clear)
+        except (RedisConnectionError, RedisTimeoutError) as exc:
+            # what django_redis's client raises, so omit_exception applies
+            raise ConnectionInterrupted(connection=None) from exc
+
+    def local_stats(self):
+        return {**self.local.stats, "bytes": self.local.bytes, "entries": len(self.local.data)}
+
+    # & local tier helpers
+    def local_key(self, key, version=None):
+        return self.make_key(key, version=version)
+
+    def store_local(self, local_key, value, generation, timeout=DEFAULT_TIMEOUT):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        timeout = self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+        if timeout > 0 and self.subscribed.is_set():
+            payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self.local.set(local_key, payload, timeout, generation=generation)
+
+    def drop(self, local_keys):
+        for local_key in local_keys:
+            self.local.delete(local_key)
+        self.publish(keys=local_keys)
+
+    # & reads
+    def get(self, key, default=None, version=None, client=None):
+        self.ensure_listener()
+        local_key = self.local_key(key, version)
+        if self.subscribed.is_set():
+            payload = self.local.get(local_key)
+            if payload is not None:
+                return pickle.loads(payload)
+        # read before Redis: an invalidation arriving between the GET and
+        # the local store must win over the value we got
+        generation = self.local.generation
+        # through RedisCache.get, which honours IGNORE_EXCEPTIONS
+        value = super().get(key, _MISSING, version=version, client=client)
+        if value is _MISSING:
+            return default
+        self.store_local(local_key, value, generation)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        self.ensure_listener()
+        found, missing = {}, []
+        for key in keys:
+            payload = self.local.get(self.local_key(key, version)) if self.subscribed.is_set() else None
+            if payload is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(payload)
+        if missing:
+            generation = self.local.generation
+            fetched = super().get_many(missing, version=version, client=client)
+            for key, value in fetched.items():
+                self.store_local(self.local_key(key, version), value, generation)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None, client=None):
+        if self.subscribed.is_set() and self.local.get(self.local_key(key, version)) is not None:
+            return True
+        return super().has_key(key, version=version, client=client)
+
+    # & writes
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None, nx=False, xx=False):
+        self.ensure_listener()
+        result = super().set(key, value, timeout=timeout, version=version, client=client, nx=nx, xx=xx)
+        local_key = self.local_key(key, version)
+        # not stored locally: a concurrent write of the same key could land
+        # in Redis after ours, the next get fills the local tier
+        if result:
+            self.drop([local_key])
+        else:
+            self.local.delete(local_key)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        return self.set(key, value, timeout=timeout, version=version, client=client, nx=True)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        result = super().set_many(data, timeout=timeout, version=version, client=client)
+        self.drop([self.local_key(key, version) for key in data])
+        return result
+
+    def delete(self, key, version=None, prefix=None, client=None):
+        result = super().delete(key, version=version, prefix=prefix, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def delete_many(self, keys, version=None, client=None):
+        result = super().delete_many(keys, version=version, client=client)
+        self.drop([self.local_key(key, version) for key in keys])
+        return result
+
+    def incr(self, key, delta=1, version=None, client=None, ignore_key_check=False):
+        result = super().incr(
+            key, delta=delta, version=version, client=client, ignore_key_check=ignore_key_check
+        )
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def decr(self, key, delta=1, version=None, client=None):
+        result = super().decr(key, delta=delta, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    # & TTL changes: a local copy could outlive the new expiry
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None, client=None):
+        result = super().touch(key, timeout=timeout, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def expire(self, key, timeout, version=None, client=None):
+        result = super().expire(key, timeout, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def pexpire(self, key, timeout, version=None, client=None):
+        result = super().pexpire(key, timeout, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def expire_at(self, key, when, version=None, client=None):
+        result = super().expire_at(key, when, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def pexpire_at(self, key, when, version=None, client=None):
+        result = super().pexpire_at(key, when, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def persist(self, key, version=None, client=None):
+        result = super().persist(key, version=version, client=client)
+        self.drop([self.local_key(key, version)])
+        return result
+
+    def delete_pattern(self, *args, **kwargs):
+        result = super().delete_pattern(*args, **kwargs)
+        self.local.clear()
+        self.publish(clear=True)
+        return result
+
+    def incr_version(self, *args, **kwargs):
+        result = super().incr_version(*args, **kwargs)
+        self.local.clear()
+        self.publish(clear=True)
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self.local.clear()
+        self.publish(clear=True)
+        return result
@@ -0,0 +1,178 @@
+import hashlib
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import transaction
+from redis.exceptions import LockError
+
+LIST_KEY_PREFIX = "product_list"
+LIST_VERSION_KEY = "product_list:version"
+
+# None outside batched_invalidation(), else a dict marking a pending bump
+_batch = ContextVar("product_list_batch", default=None)
+
+
+def new_generation():
+    # time based, so a version key lost to eviction never restarts at a
+    # number that cached pages were already built for
+    return time.time_ns() // 1000
+
+
+def get_list_version():
+    version = cache.get(LIST_VERSION_KEY)
+    if version is None:
+        cache.add(LIST_VERSION_KEY, new_generation(), timeout=None)
+        version = cache.get(LIST_VERSION_KEY)
+    return version
+
+
+def bump_list_version():
+    """
+    O(1) invalidation: cached pages carry the version they were built
+    for, so after an INCR every one of them is stale.
+    Replaces cache.delete_pattern("*product_list*"), a SCAN of the keyspace.
+    """
+    try:
+        cache.incr(LIST_VERSION_KEY)
+    except ValueError:
+        # key missing (evicted / never read), start a new generation
+        cache.add(LIST_VERSION_KEY, new_generation(), timeout=None)
+
+
+def invalidate_product_list():
+    # also call it after writes that skip signals (bulk_create, update())
+    batch = _batch.get()
+    if batch is not None:
+        batch["dirty"] = True
+        return
+    # after commit, so a reader can't re-cache the old rows under the new version
+    transaction.on_commit(bump_list_version)
+
+
+@contextmanager
+def batched_invalidation():
+    """
+    Writes inside the block bump the list version once, at the end,
+    instead of once per row (imports, bulk jobs). Nests.
+    """
+    if _batch.get() is not None:
+        yield
+        return
+    batch = {"dirty": False}
+    token = _batch.set(batch)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        if batch["dirty"]:
+            transaction.on_commit(bump_list_version)
+
+
+# & stampede protected list cache
+class StaleWhileRevalidateCache:
+    """
+    Entries are {"value", "version", "fresh_until"} stored for
+    ttl + stale_ttl. A fresh entry is a hit. Otherwise one request takes
+    a lease (a django_redis lock: SET NX PX with a random token, released
+    by a compare-and-delete script) and rebuilds, while the
+    others serve the stale entry, or, when there is none yet, wait for
+    the lease holder's result. TTLs are jittered so pages built together
+    don't expire together.
+    """
+
+    def __init__(
+        self,
+        ttl=60 * 15,
+        stale_ttl=60 * 60,
+        jitter=0.1,
+        lease_timeout=30,
+        wait_timeout=10,
+        poll_interval=0.05,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.jitter = jitter
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.metrics = Counter()
+
+    def is_fresh(self, entry, version):
+        return entry["version"] == version and entry["fresh_until"] > time.time()
+
+    def jittered(self, timeout):
+        return timeout * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def store(self, key, value, version):
+        ttl = self.jittered(self.ttl)
+        entry = {"value": value, "version": version, "fresh_until": time.time() + ttl}
+        cache.set(key, entry, timeout=int(ttl + self.stale_ttl))
+
+    def acquire(self, key):
+        if hasattr(cache, "lock"):
+            lease = cache.lock(f"{key}:lease", timeout=self.lease_timeout, thread_local=False)
+            return lease if lease.acquire(blocking=False) else None
+        # other backends (locmem in tests): cache.add and a token
+        token = uuid.uuid4().hex
+        if cache.add(f"{key}:lease", token, timeout=self.lease_timeout):
+            return token
+        return None
+
+    def release(self, key, lease):
+        # only drop our own lease, not one taken after ours expired
+        if isinstance(lease, str):
+            if cache.get(f"{key}:lease") == lease:
+                cache.delete(f"{key}:lease")
+            return
+        try:
+            lease.release()
+        except LockError:
+            pass
+
+    def rebuild(self, key, build, version, lease):
+        try:
+            value = build()
+            self.store(key, value, version)
+            return value
+        finally:
+            self.release(key, lease)
+
+    def get_or_build(self, key, build, version):
+        entry = cache.get(key)
+        if entry is not None and self.is_fresh(entry, version):
+            self.metrics["hits"] += 1
+            return entry["value"]
+        lease = self.acquire(key)
+        if lease is not None:
+            self.metrics["misses" if entry is None else "revalidations"] += 1
+            return self.rebuild(key, build, version, lease)
+        if entry is not None:
+            # someone else is rebuilding, serve what we have
+            self.metrics["stale"] += 1
+            return entry["value"]
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = cache.get(key)
+            if entry is not None and entry["version"] == version:
+                self.metrics["waits"] += 1
+                return entry["value"]
+        # the lease holder died or is too slow, build it ourselves
+        self.metrics["wait_timeouts"] += 1
+        value = build()
+        self.store(key, value, version)
+        return value
+
+
+product_list_cache = StaleWhileRevalidateCache()
+
+
+def product_list_key(request):
+    # no version in the key: an invalidated page stays around as a stale copy
+    digest = hashlib.md5(request.get_full_path().encode("utf-8")).hexdigest()
+    return f"{LIST_KEY_PREFIX}:{digest}"
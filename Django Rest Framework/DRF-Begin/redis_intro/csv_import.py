@@ -0,0 +1,139 @@
+import csv
+import io
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from .cache import batched_invalidation, invalidate_product_list
+from .models import Products
+
+COLUMNS = ("name", "hs_code", "price")
+
+CENTS = Decimal("0.01")
+MAX_PRICE = Decimal("10") ** 10  # max_digits=12, decimal_places=2
+
+
+class RowError(ValueError):
+    pass
+
+
+def clean_row(row, index):
+    """
+    (name, hs_code, price) from a csv row, using the header positions in
+    `index`. Only what the table needs is checked, so the per row cost
+    stays a few string ops and one Decimal().
+    """
+    try:
+        name = row[index["name"]].strip()
+        hs_code = row[index["hs_code"]].strip()
+        price = Decimal(row[index["price"]]).quantize(CENTS)
+    except IndexError:
+        raise RowError(f"missing columns {row!r}")
+    except InvalidOperation:
+        raise RowError(f"bad price {row[index['price']]!r}")
+    if not name or len(name) > 255:
+        raise RowError("name must be 1-255 characters")
+    if not price.is_finite() or abs(price) >= MAX_PRICE:
+        raise RowError(f"price out of range {price}")
+    if not hs_code.isdigit() or len(hs_code) > 6:
+        raise RowError(f"bad hs_code {hs_code!r}")
+    return name, hs_code, price
+
+
+def copy_rows(rows):
+    """
+    COPY ... FROM STDIN (PostgreSQL): one round trip per batch and no
+    INSERT parsing / planning per row.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    table = connection.ops.quote_name(Products._meta.db_table)
+    sql = f"COPY {table} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):  # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def insert_rows(rows, batch_size):
+    Products.objects.bulk_create(
+        [Products(name=name, hs_code=hs_code, price=price) for name, hs_code, price in rows],
+        batch_size=batch_size,
+    )
+
+
+def import_products(
+    path,
+    batch_size=1000,
+    start_row=0,
+    use_copy=None,
+    strict=False,
+    progress=None,
+    checkpoint=None,
+):
+    """
+    Stream `path` into Products `batch_size` rows at a time, one
+    transaction per batch, so memory stays O(batch_size). Rows before
+    `start_row` (data rows, header excluded) are skipped, and with a
+    `checkpoint` file the position is saved after every committed batch
+    and picked up on the next run. Invalid rows are skipped and reported,
+    or abort the import with strict=True.
+    The product list cache is invalidated once, when the import ends or
+    fails after some batches were committed, not per row.
+    Returns {"loaded", "skipped", "errors"}.
+    """
+    if use_copy is None:
+        use_copy = connection.vendor == "postgresql"
+    checkpoint = Path(checkpoint) if checkpoint else None
+    if checkpoint and checkpoint.exists():
+        start_row = max(start_row, int(checkpoint.read_text() or 0))
+
+    loaded, skipped, errors = 0, 0, []
+    started = time.perf_counter()
+    with open(path, newline="", encoding="utf-8") as file, batched_invalidation():
+        reader = csv.reader(file)
+        header = next(reader)
+        index = {column: header.index(column) for column in COLUMNS}
+        position = start_row
+        rows_iter = islice(reader, start_row, None)
+        while True:
+            chunk = list(islice(rows_iter, batch_size))
+            if not chunk:
+                break
+            rows = []
+            for offset, row in enumerate(chunk):
+                try:
+                    rows.append(clean_row(row, index))
+                except RowError as exc:
+                    # +2: 1-based and the header line
+                    line = position + offset + 2
+                    if strict:
+                        raise RowError(f"line {line}: {exc}")
+                    skipped += 1
+                    if len(errors) < 20:
+                        errors.append(f"line {line}: {exc}")
+            with transaction.atomic():
+                if rows:
+                    if use_copy:
+                        copy_rows(rows)
+                    else:
+                        insert_rows(rows, batch_size)
+            if rows:
+                # merged into one bump by batched_invalidation(), which
+                # also runs when a later batch raises
+                invalidate_product_list()
+            position += len(chunk)
+            loaded += len(rows)
+            if checkpoint:
+                checkpoint.write_text(str(position))
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress(position, loaded, skipped, loaded / elapsed if elapsed else 0.0)
+    return {"loaded": loaded, "skipped": skipped, "errors": errors}
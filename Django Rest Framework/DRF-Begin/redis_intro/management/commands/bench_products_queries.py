@@ -0,0 +1,107 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+
+from redis_intro.models import Products
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN and time the ProductFilterListAPIView queries with the Products "
+        "indexes, then again with them dropped inside a rolled back transaction. "
+        "Dropping takes an exclusive lock on the table, run it against a dev database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hs-code", default=None, help="default: the most common one")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def queries(self, hs_code):
+        prices = Products.objects.filter(hs_code=hs_code).order_by("price").values_list("price", flat=True)
+        low = prices.first() or Decimal("0")
+        high = prices.last() or Decimal("0")
+        middle = (low + high) / 2
+        return [
+            ("hs_code =", Products.objects.filter(hs_code=hs_code).order_by("price", "id")),
+            (
+                "hs_code = and price range",
+                Products.objects.filter(hs_code=hs_code, price__gte=low, price__lte=middle).order_by(
+                    "price", "id"
+                ),
+            ),
+            (
+                "hs_code prefix",
+                Products.objects.filter(hs_code__startswith=hs_code[:4]).order_by("hs_code", "price", "id"),
+            ),
+        ]
+
+    def explain(self, qs, tag):
+        # tagged SQL: SQLite keeps serving a cached EXPLAIN plan of the
+        # identical statement after the DROP INDEX
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} /* {tag} */", params)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+    def measure(self, queries, repeat, tag):
+        results = {}
+        for label, qs in queries:
+            qs = qs[:100]
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(qs.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[label] = (statistics.median(timings), self.explain(qs, tag))
+        return results
+
+    def secondary_indexes(self):
+        table = Products._meta.db_table
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        return [
+            name
+            for name, info in constraints.items()
+            if info["index"] and not info["primary_key"] and not info["unique"]
+        ]
+
+    def handle(self, *args, **options):
+        hs_code = options["hs_code"]
+        if hs_code is None:
+            top = (
+                Products.objects.values("hs_code")
+                .annotate(n=Count("id"))
+                .order_by("-n")
+                .first()
+            )
+            if top is None:
+                raise CommandError("No products, load some with `manage.py import_products` first.")
+            hs_code = top["hs_code"]
+        queries = self.queries(hs_code)
+        repeat = options["repeat"]
+
+        with transaction.atomic():
+            after = self.measure(queries, repeat, "after")
+            indexes = self.secondary_indexes()
+            with connection.cursor() as cursor:
+                for name in indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+            before = self.measure(queries, repeat, "before")
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{Products.objects.count()} products, hs_code {hs_code}, "
+            f"dropped for 'before': {', '.join(indexes) or 'none'}\n"
+        )
+        for label, _ in queries:
+            before_ms, before_plan = before[label]
+            after_ms, after_plan = after[label]
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(f"  before {before_ms:8.3f} ms\n    " + before_plan.replace("\n", "\n    "))
+            self.stdout.write(f"  after  {after_ms:8.3f} ms\n    " + after_plan.replace("\n", "\n    "))
+            speedup = before_ms / after_ms if after_ms else 0
+            self.stdout.write(f"  {speedup:.1f}x\n")
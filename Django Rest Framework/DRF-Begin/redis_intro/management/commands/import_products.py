@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from redis_intro.csv_import import RowError, import_products
+
+
+class Command(BaseCommand):
+    help = "Stream a products CSV (name,hs_code,price) into redis_intro.Products in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="products.csv")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--start-row", type=int, default=0, help="data rows to skip")
+        parser.add_argument(
+            "--checkpoint", default=None, help="file keeping the position, to resume a failed import"
+        )
+        parser.add_argument(
+            "--no-copy", action="store_true", help="bulk_create even on PostgreSQL"
+        )
+        parser.add_argument("--strict", action="store_true", help="stop at the first invalid row")
+
+    def progress(self, position, loaded, skipped, rate):
+        self.stdout.write(f"row {position}: {loaded} loaded, {skipped} skipped ({rate:,.0f} rows/s)")
+
+    def handle(self, *args, **options):
+        try:
+            result = import_products(
+                options["path"],
+                batch_size=options["batch_size"],
+                start_row=options["start_row"],
+                use_copy=False if options["no_copy"] else None,
+                strict=options["strict"],
+                progress=self.progress,
+                checkpoint=options["checkpoint"],
+            )
+        except (OSError, RowError) as exc:
+            raise CommandError(exc)
+        except ValueError as exc:
+            # header without one of the expected columns
+            raise CommandError(f"Bad header: {exc}")
+        for error in result["errors"]:
+            self.stderr.write(error)
+        self.stdout.write(
+            self.style.SUCCESS(f"Done, {result['loaded']} loaded, {result['skipped']} skipped")
+        )
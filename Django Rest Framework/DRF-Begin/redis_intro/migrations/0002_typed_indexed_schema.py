@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 08:35
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('redis_intro', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='products',
+            name='hs_code',
+            field=models.CharField(db_index=True, max_length=6),
+        ),
+        migrations.AlterField(
+            model_name='products',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='products',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['hs_code', 'price'], name='products_hs_code_price_idx'),
+        ),
+    ]
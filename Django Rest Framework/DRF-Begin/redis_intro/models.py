@@ -1,8 +1,18 @@
+from decimal import Decimal
+
 from django.db import models
 
 
 # Create your models here.
 class Products(models.Model):
-    name = models.CharField()
-    hs_code = models.CharField(max_length=6)
-    price = models.FloatField(default=0.0)
+    name = models.CharField(max_length=255)
+    # HS codes are hierarchical (chapter 84, heading 8471, ...), the
+    # plain index serves exact and, on PostgreSQL, prefix lookups
+    hs_code = models.CharField(max_length=6, db_index=True)
+    price = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        indexes = [
+            # WHERE hs_code = %s AND price BETWEEN %s AND %s ORDER BY price
+            models.Index(fields=["hs_code", "price"], name="products_hs_code_price_idx"),
+        ]
@@ -6,3 +6,22 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Products
         fields = "__all__"
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Query params of ProductFilterListAPIView. One of hs_code / hs_prefix
+    is required so every query starts on an hs_code index.
+    """
+
+    hs_code = serializers.RegexField(r"^\d{1,6}$", required=False)
+    hs_prefix = serializers.RegexField(r"^\d{1,6}$", required=False)
+    min_price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=12, decimal_places=2, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get("hs_code") and not attrs.get("hs_prefix"):
+            raise serializers.ValidationError("hs_code or hs_prefix is required.")
+        if attrs.get("hs_code") and attrs.get("hs_prefix"):
+            raise serializers.ValidationError("Use either hs_code or hs_prefix.")
+        return attrs
@@ -1,7 +1,7 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
-from django.core.cache import cache
+from .cache import invalidate_product_list
 from .models import Products
 
 
@@ -9,5 +9,5 @@ from .models import Products
 def invalidate_products_list_cache(sender, instance, *args, **kwargs):
     # cache.clear()
 
-    # invalidate all the keys that has keyprefix= product_list
-    cache.delete_pattern("*product_list*")
+    # bump the product_list version instead of cache.delete_pattern("*product_list*")
+    invalidate_product_list()
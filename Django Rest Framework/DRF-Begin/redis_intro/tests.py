@@ -1,3 +1,493 @@
-from django.test import TestCase
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from .backends import LocalLRU, TwoTierRedisCache
+from .cache import StaleWhileRevalidateCache, get_list_version
+from .csv_import import RowError, import_products
+from .models import Products
+
+try:
+    import fakeredis
+except ImportError:  # not a runtime dependency
+    fakeredis = None
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def fake_redis_caches(server, location=None):
+    return {
+        "default": {
+            "BACKEND": "redis_intro.backends.TwoTierRedisCache",
+            # the local tier is shared per LOCATION, a fresh one per test
+            "LOCATION": location or f"redis://{uuid.uuid4().hex}:6379/0",
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "CONNECTION_POOL_KWARGS": {
+                    "connection_class": fakeredis.FakeConnection,
+                    "server": server,
+                },
+            },
+        }
+    }
+
+
+class SlowBuild:
+    def __init__(self, value, seconds=0.2):
+        self.value = value
+        self.seconds = seconds
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.seconds)
+        return self.value
+
+
+@override_settings(CACHES=LOCMEM)
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.swr = StaleWhileRevalidateCache(ttl=60, jitter=0, wait_timeout=5, poll_interval=0.01)
+        self.key = f"test:{uuid.uuid4().hex}"
+
+    def burst(self, build, version, requests=8):
+        results = []
+
+        def request():
+            results.append(self.swr.get_or_build(self.key, build, version))
+
+        threads = [threading.Thread(target=request) for _ in range(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_cold_burst_builds_once(self):
+        build = SlowBuild("page")
+        self.assertEqual(self.burst(build, version=1), ["page"] * 8)
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(self.swr.metrics["misses"], 1)
+        self.assertEqual(self.swr.metrics["waits"], 7)
+
+    def test_fresh_entry_is_a_hit(self):
+        self.swr.get_or_build(self.key, lambda: "page", 1)
+        build = SlowBuild("other")
+        self.assertEqual(self.swr.get_or_build(self.key, build, 1), "page")
+        self.assertEqual(build.calls, 0)
+        self.assertEqual(self.swr.metrics["hits"], 1)
+
+    def test_invalidated_burst_serves_stale_while_one_rebuilds(self):
+        self.swr.get_or_build(self.key, lambda: "old", 1)
+        build = SlowBuild("new")
+        results = self.burst(build, version=2)
+        self.assertEqual(build.calls, 1)
+        self.assertEqual(sorted(results), ["new"] + ["old"] * 7)
+        self.assertEqual(self.swr.metrics["revalidations"], 1)
+        self.assertEqual(self.swr.metrics["stale"], 7)
+        self.assertEqual(self.swr.get_or_build(self.key, build, 2), "new")
+
+    def test_expired_entry_is_revalidated(self):
+        self.swr.get_or_build(self.key, lambda: "old", 1)
+        entry = cache.get(self.key)
+        entry["fresh_until"] = time.time() - 1
+        cache.set(self.key, entry)
+        self.assertEqual(self.swr.get_or_build(self.key, lambda: "new", 1), "new")
+        self.assertEqual(self.swr.metrics["revalidations"], 1)
+
+    def test_stale_entry_served_while_lease_is_held(self):
+        self.swr.get_or_build(self.key, lambda: "old", 1)
+        lease = self.swr.acquire(self.key)
+        build = SlowBuild("new")
+        self.assertEqual(self.swr.get_or_build(self.key, build, 2), "old")
+        self.assertEqual(build.calls, 0)
+        self.swr.release(self.key, lease)
+        self.assertEqual(self.swr.get_or_build(self.key, build, 2), "new")
+
+    def test_waiter_builds_itself_when_the_lease_holder_is_gone(self):
+        self.swr.wait_timeout = 0.05
+        self.swr.acquire(self.key)  # never released
+        self.assertEqual(self.swr.get_or_build(self.key, lambda: "page", 1), "page")
+        self.assertEqual(self.swr.metrics["wait_timeouts"], 1)
+
+    def test_lease_is_released_when_build_fails(self):
+        def fail():
+            raise RuntimeError("database down")
+
+        with self.assertRaises(RuntimeError):
+            self.swr.get_or_build(self.key, fail, 1)
+        self.assertEqual(self.swr.get_or_build(self.key, lambda: "page", 1), "page")
+        self.assertEqual(self.swr.metrics["misses"], 2)
+
+    def test_release_keeps_a_lease_taken_after_ours_expired(self):
+        self.swr.lease_timeout = 1
+        ours = self.swr.acquire(self.key)
+        time.sleep(1.1)
+        theirs = self.swr.acquire(self.key)
+        self.assertIsNotNone(theirs)
+        self.swr.release(self.key, ours)
+        self.assertIsNone(self.swr.acquire(self.key))
+        self.swr.release(self.key, theirs)
+        self.assertIsNotNone(self.swr.acquire(self.key))
+
+
+# the lease is a django_redis lock, released by a Lua script
+@skipUnless(
+    fakeredis is not None and importlib.util.find_spec("lupa"),
+    "needs fakeredis with Lua support (lupa)",
+)
+class RedisStaleWhileRevalidateTests(StaleWhileRevalidateTests):
+    def setUp(self):
+        override = override_settings(CACHES=fake_redis_caches(fakeredis.FakeServer()))
+        override.enable()
+        self.addCleanup(override.disable)
+        super().setUp()
+
+    def test_lease_is_a_lock(self):
+        self.assertNotIsInstance(self.swr.acquire(self.key), str)
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class LocalLRUTests(SimpleTestCase):
+    def test_evicts_least_recently_used_by_bytes(self):
+        lru = LocalLRU(max_bytes=100)
+        lru.set("a", b"a" * 40, 60)
+        lru.set("b", b"b" * 40, 60)
+        lru.get("a")  # b is now the oldest
+        lru.set("c", b"c" * 40, 60)
+        self.assertEqual(list(lru.data), ["a", "c"])
+        self.assertEqual(lru.bytes, 80)
+        self.assertEqual(lru.stats["evictions"], 1)
+
+    def test_replacing_and_deleting_keeps_byte_count(self):
+        lru = LocalLRU(max_bytes=100)
+        lru.set("a", b"a" * 40, 60)
+        lru.set("a", b"a" * 10, 60)
+        self.assertEqual(lru.bytes, 10)
+        lru.delete("a")
+        self.assertEqual((lru.bytes, len(lru.data)), (0, 0))
+
+    def test_oversized_payload_is_not_stored(self):
+        lru = LocalLRU(max_bytes=100)
+        lru.set("a", b"a" * 40, 60)
+        lru.set("big", b"x" * 101, 60)
+        self.assertEqual(list(lru.data), ["a"])
+
+    def test_expired_entries_miss(self):
+        lru = LocalLRU(max_bytes=100)
+        lru.set("a", b"a", 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(lru.get("a"))
+        self.assertEqual(lru.bytes, 0)
+
+    def test_set_skipped_after_invalidation(self):
+        lru = LocalLRU(max_bytes=100)
+        generation = lru.generation
+        lru.delete("other")
+        lru.set("a", b"a", 60, generation=generation)
+        self.assertIsNone(lru.get("a"))
+        lru.set("a", b"a", 60, generation=lru.generation)
+        self.assertEqual(lru.get("a"), b"a")
+
+
+@skipUnless(fakeredis is not None, "needs fakeredis")
+class TwoTierRedisCacheTests(SimpleTestCase):
+    """
+    Two backends with their own local tier (different LOCATION) on one
+    fake Redis server stand in for two processes.
+    """
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.a = self.make_cache()
+        self.b = self.make_cache()
+        for backend in (self.a, self.b):
+            backend.ensure_listener()
+            wait_for(backend.subscribed.is_set)
+
+    def make_cache(self, **options):
+        params = fake_redis_caches(self.server)["default"]
+        params["OPTIONS"].update(options)
+        return TwoTierRedisCache(params["LOCATION"], params)
+
+    def remote(self, method, *args):
+        # a writes, and returns once b has handled the invalidation
+        generation = self.b.local.generation
+        result = getattr(self.a, method)(*args)
+        wait_for(lambda: self.b.local.generation != generation)
+        return result
+
+    def is_local(self, backend, key):
+        return backend.local_key(key) in backend.local.data
+
+    def test_reads_fill_the_local_tier(self):
+        self.remote("set", "key", {"v": 1})
+        self.assertEqual(self.b.get("key"), {"v": 1})
+        self.assertTrue(self.is_local(self.b, "key"))
+        hits = self.b.local.stats["hits"]
+        self.assertEqual(self.b.get("key"), {"v": 1})
+        self.assertEqual(self.b.local.stats["hits"], hits + 1)
+
+    def test_remote_set_evicts(self):
+        self.remote("set", "key", "old")
+        self.b.get("key")
+        self.remote("set", "key", "new")
+        self.assertFalse(self.is_local(self.b, "key"))
+        self.assertEqual(self.b.get("key"), "new")
+
+    def test_remote_delete_evicts(self):
+        self.remote("set", "key", "old")
+        self.b.get("key")
+        self.remote("delete", "key")
+        self.assertFalse(self.is_local(self.b, "key"))
+        self.assertIsNone(self.b.get("key"))
+
+    def test_remote_incr_evicts(self):
+        self.remote("set", "counter", 1)
+        self.assertEqual(self.b.get("counter"), 1)
+        self.remote("incr", "counter")
+        self.assertFalse(self.is_local(self.b, "counter"))
+        self.assertEqual(self.b.get("counter"), 2)
+
+    def test_remote_ttl_changes_evict(self):
+        calls = [
+            ("touch", 30),
+            ("expire", 30),
+            ("pexpire", 30000),
+            ("expire_at", int(time.time()) + 30),
+            ("persist",),
+        ]
+        for method, *args in calls:
+            with self.subTest(method=method):
+                self.remote("set", "key", "value", 60)
+                self.b.get("key")
+                self.assertTrue(self.is_local(self.b, "key"))
+                self.assertTrue(self.remote(method, "key", *args))
+                self.assertFalse(self.is_local(self.b, "key"))
+
+    def test_redis_errors_follow_ignore_exceptions(self):
+        broken = mock.Mock()
+        for name in ("get", "set", "delete", "publish"):
+            getattr(broken, name).side_effect = RedisConnectionError("down")
+        tolerant = self.make_cache(IGNORE_EXCEPTIONS=True)
+        for backend in (tolerant, self.a):
+            backend.ensure_listener()
+            mock.patch.object(backend.client, "get_client", return_value=broken).start()
+        self.addCleanup(mock.patch.stopall)
+        self.assertEqual(tolerant.get("key", "default"), "default")
+        tolerant.set("key", "value")
+        tolerant.delete("key")
+        for call in [lambda: self.a.get("key"), lambda: self.a.delete("key")]:
+            with self.assertRaises(RedisConnectionError):
+                call()
+
+    def test_remote_clear_empties_the_tier(self):
+        self.remote("set_many", {"one": 1, "two": 2})
+        self.assertEqual(self.b.get_many(["one", "two"]), {"one": 1, "two": 2})
+        self.assertEqual(len(self.b.local.data), 2)
+        self.remote("clear")
+        self.assertFalse(self.b.local.data)
+        self.assertIsNone(self.b.get("one"))
+
+    def test_own_messages_are_ignored(self):
+        self.a.set("key", "value")
+        self.a.get("key")
+        generation = self.a.local.generation
+        self.b.set("other", "value")  # a hears it, but for another key
+        wait_for(lambda: self.a.local.generation != generation)
+        self.assertTrue(self.is_local(self.a, "key"))
+
+    def test_invalidation_during_a_read_wins(self):
+        # a's write and its message land between b's GET and b's local store
+        self.remote("set", "key", "old")
+        read = self.b._get
+
+        def racing_get(*args, **kwargs):
+            value = read(*args, **kwargs)
+            self.remote("set", "key", "new")
+            return value
+
+        with mock.patch.object(self.b, "_get", racing_get):
+            self.assertEqual(self.b.get("key"), "old")
+        self.assertFalse(self.is_local(self.b, "key"))
+        self.assertEqual(self.b.get("key"), "new")
+
+    def test_tier_cleared_when_subscription_is_lost(self):
+        self.remote("set", "key", "old")
+        self.b.get("key")
+        self.assertTrue(self.is_local(self.b, "key"))
+        # the next message b receives fails the way a dropped connection would
+        with self.assertLogs("redis_intro.backends", "ERROR"):
+            with mock.patch.object(self.b.tier, "handle_message", side_effect=ConnectionError):
+                self.a.set("other", 1)
+                wait_for(lambda: not self.b.subscribed.is_set())
+        self.assertFalse(self.b.local.data)
+        # unsubscribed: reads go to Redis and aren't kept
+        self.assertEqual(self.b.get("key"), "old")
+        self.assertFalse(self.is_local(self.b, "key"))
+        self.a.set("key", "new")
+        wait_for(self.b.subscribed.is_set, timeout=5)
+        self.assertEqual(self.b.get("key"), "new")
+        self.assertTrue(self.is_local(self.b, "key"))
+
+
+@override_settings(CACHES=LOCMEM)
+class ImportProductsTests(TestCase):
+    def write_csv(self, rows):
+        file = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        with file:
+            file.write("name,hs_code,price\n")
+            file.writelines(f"{row}\n" for row in rows)
+        self.addCleanup(os.unlink, file.name)
+        return file.name
+
+    def test_import_bumps_list_version_once(self):
+        path = self.write_csv(["a,847130,1.50", "b,847130,2", "c,851712,3", "bad,1,x"])
+        version = get_list_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            result = import_products(path, batch_size=2)
+        self.assertEqual((result["loaded"], result["skipped"]), (3, 1))
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(get_list_version(), version)
+
+    def test_failed_import_still_invalidates_committed_batches(self):
+        path = self.write_csv(["a,847130,1.50", "b,847130,2", "bad,1,x", "d,851712,3"])
+        version = get_list_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RowError):
+                import_products(path, batch_size=2, strict=True)
+        self.assertEqual(Products.objects.count(), 2)
+        self.assertNotEqual(get_list_version(), version)
+
+
+@override_settings(CACHES=LOCMEM)
+class ProductFilterTests(TestCase):
+    url = "/redis/products/filter/"
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = [
+            ("laptop", "847130", "999.00"),
+            ("tablet", "847130", "250.00"),
+            ("netbook", "847130", "250.00"),
+            ("cheap laptop", "847130", "99.99"),
+            ("desktop", "847150", "500.00"),
+            ("printer", "844332", "120.00"),
+            ("phone", "851712", "300.00"),
+        ]
+        cls.products = {
+            name: Products.objects.create(name=name, hs_code=code, price=Decimal(price))
+            for name, code, price in rows
+        }
+
+    def names(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row["name"] for row in response.data["results"]]
+
+    def test_an_hs_code_filter_is_required(self):
+        for query in ["", "?min_price=1", "?hs_code=847130&hs_prefix=84"]:
+            with self.subTest(query=query):
+                response = self.client.get(self.url + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("non_field_errors", response.data)
+
+    def test_invalid_params(self):
+        for query, field in [
+            ("?hs_code=8471301", "hs_code"),
+            ("?hs_code=84a", "hs_code"),
+            ("?hs_prefix=", "non_field_errors"),
+            ("?hs_code=847130&min_price=cheap", "min_price"),
+            ("?hs_code=847130&max_price=1.001", "max_price"),
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(self.url + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+
+    def test_hs_code_is_ordered_by_price_then_id(self):
+        response = self.client.get(self.url + "?hs_code=847130")
+        self.assertEqual(self.names(response), ["cheap laptop", "tablet", "netbook", "laptop"])
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(response.data["results"][0]["price"], "99.99")
+
+    def test_price_bounds_are_inclusive(self):
+        query = "?hs_code=847130&min_price=99.99&max_price=250"
+        self.assertEqual(self.names(self.client.get(self.url + query)), ["cheap laptop", "tablet", "netbook"])
+        query = "?hs_code=847130&min_price=100"
+        self.assertEqual(self.names(self.client.get(self.url + query)), ["tablet", "netbook", "laptop"])
+        query = "?hs_code=847130&min_price=300&max_price=200"
+        self.assertEqual(self.names(self.client.get(self.url + query)), [])
+
+    def test_hs_prefix_is_ordered_by_code_then_price(self):
+        response = self.client.get(self.url + "?hs_prefix=84")
+        self.assertEqual(
+            self.names(response),
+            ["printer", "cheap laptop", "tablet", "netbook", "laptop", "desktop"],
+        )
+        response = self.client.get(self.url + "?hs_prefix=8471&max_price=250")
+        self.assertEqual(self.names(response), ["cheap laptop", "tablet", "netbook"])
+
+    def test_pagination(self):
+        response = self.client.get(self.url + "?hs_prefix=84&limit=2&offset=1")
+        self.assertEqual(self.names(response), ["cheap laptop", "tablet"])
+        self.assertEqual(response.data["count"], 6)
+        self.assertIn("offset=3", response.data["next"])
+        self.assertIn("hs_prefix=84", response.data["next"])
+        response = self.client.get(self.url + "?hs_prefix=84&limit=5000")
+        self.assertEqual(len(self.names(response)), 6)
+        self.assertIsNone(response.data["next"])
+
+
+@override_settings(CACHES=LOCMEM)
+class DecimalPriceMigrationTests(TransactionTestCase):
+    """0002 turns the float price column into DECIMAL(12, 2)."""
+
+    app = "redis_intro"
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([(self.app, target)])
+        return executor.loader.project_state([(self.app, target)]).apps
+
+    def tearDown(self):
+        leaf = MigrationExecutor(connection).loader.graph.leaf_nodes(self.app)[0][1]
+        self.migrate(leaf)
+
+    def test_float_prices_become_decimals(self):
+        old_apps = self.migrate("0001_initial")
+        OldProducts = old_apps.get_model(self.app, "Products")
+        for name, price in [("a", 19.99), ("b", 0.1 + 0.2), ("c", 3), ("d", 0.0)]:
+            OldProducts.objects.create(name=name, hs_code="847130", price=price)
+        new_apps = self.migrate("0002_typed_indexed_schema")
+        NewProducts = new_apps.get_model(self.app, "Products")
+        prices = dict(NewProducts.objects.values_list("name", "price"))
+        self.assertEqual(
+            prices,
+            {"a": Decimal("19.99"), "b": Decimal("0.30"), "c": Decimal("3.00"), "d": Decimal("0.00")},
+        )
+        self.assertEqual(
+            list(NewProducts.objects.filter(price__gte=Decimal("3")).order_by("price").values_list("name", flat=True)),
+            ["c", "a"],
+        )
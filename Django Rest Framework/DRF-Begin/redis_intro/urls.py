@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import ProductListCreateAPIView, clear_cache
+from .views import ProductFilterListAPIView, ProductListCreateAPIView, cache_stats, clear_cache
 
 urlpatterns = [
     path("products/", ProductListCreateAPIView.as_view(), name="test"),
+    path("products/filter/", ProductFilterListAPIView.as_view(), name="products-filter"),
     path("clear/", clear_cache, name="clear-cache"),
+    path("cache-stats/", cache_stats, name="cache-stats"),
 ]
@@ -1,11 +1,12 @@
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from rest_framework import generics, mixins
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
 from .models import Products
-from .serializers import ProductSerializer
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from .serializers import ProductFilterSerializer, ProductSerializer
 from django.core.cache import cache
+from .cache import get_list_version, product_list_cache, product_list_key
 
 
 class ProductListCreateAPIView(
@@ -14,9 +15,14 @@ class ProductListCreateAPIView(
     serializer_class = ProductSerializer
     queryset = Products.objects.all()
 
-    @method_decorator(cache_page(60 * 15, key_prefix="product_list"))
     def get(self, request, *args, **kwargs):
-        return self.list(request, *args, **kwargs)
+        # single flight rebuild + stale-while-revalidate (redis_intro/cache.py)
+        data = product_list_cache.get_or_build(
+            product_list_key(request),
+            lambda: self.list(request, *args, **kwargs).data,
+            version=get_list_version(),
+        )
+        return Response(data)
 
     def post(self, request, *args, **kwargs):
         return self.create(request, *args, **kwargs)
@@ -28,6 +34,42 @@ class ProductListCreateAPIView(
         return super().get_queryset()
 
 
+class ProductFilterPagination(LimitOffsetPagination):
+    default_limit = 100
+    max_limit = 1000
+
+
+class ProductFilterListAPIView(generics.ListAPIView):
+    """
+    ?hs_code=847130[&min_price=..&max_price=..] -> (hs_code, price) index,
+    rows come back in index order.
+    ?hs_prefix=84 (chapter / heading) -> hs_code index (LIKE '84%').
+    """
+
+    serializer_class = ProductSerializer
+    pagination_class = ProductFilterPagination
+
+    def get_queryset(self):
+        params = ProductFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        qs = Products.objects.all()
+        if "min_price" in filters:
+            qs = qs.filter(price__gte=filters["min_price"])
+        if "max_price" in filters:
+            qs = qs.filter(price__lte=filters["max_price"])
+        if "hs_code" in filters:
+            return qs.filter(hs_code=filters["hs_code"]).order_by("price", "id")
+        return qs.filter(hs_code__startswith=filters["hs_prefix"]).order_by("hs_code", "price", "id")
+
+
 def clear_cache(request):
     cache.clear()
     return HttpResponse("Cache cleared")
+
+
+def cache_stats(request):
+    data = dict(product_list_cache.metrics)
+    if hasattr(cache, "local_stats"):
+        data["local"] = cache.local_stats()
+    return JsonResponse(data)
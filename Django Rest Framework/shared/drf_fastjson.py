@@ -0,0 +1,62 @@
+"""
+orjson-backed JSON renderer and parser for DRF, shared by the CEnt
+backend and DRF-Begin (both settings.py put this directory on sys.path).
+"""
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # stdlib json through the regular DRF classes
+    orjson = None
+
+drf_encoder = encoders.JSONEncoder()
+
+
+def orjson_default(obj):
+    # only called for types orjson doesn't do itself (Decimal, lazy strings,
+    # timedelta, querysets ...) and for the passed through date/time types,
+    # so those are formatted by DRF itself (precision, "Z" for UTC) rather
+    # than by orjson's own rules
+    return drf_encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed. Output is the same
+    bytes as DRF's compact JSON, with one exception: NaN and Infinity
+    render as null, where DRF (STRICT_JSON) raises ValueError.
+    Indented / browsable API output still goes through the stdlib.
+    """
+
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=orjson_default, option=self.options)
+        # same escaping as DRF, keeps the output safe to embed in <script>
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson when it is installed."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")